@@ -2,12 +2,65 @@
 # The __init__ file is used not only to import the sub-modules, but also to
 # set everything up properly.
 #
+# The sub-modules are loaded on first use of one of their routines, which
+# keeps the import of the package cheap. Check the import time with
+#   python -X importtime -c "import blendaviz" 2>&1 | tail -n 5
+# No sub-module should appear in the output.
+#
+
+'''
+Test:
+import sys
+import blendaviz
+assert not [name for name in sys.modules if name.startswith('blendaviz.')]
+blendaviz.plot
+assert 'blendaviz.plot1d' in sys.modules
+assert not [name for name in ['blendaviz.plot2d', 'blendaviz.plot3d', 'blendaviz.streamlines',
+                              'blendaviz.vectors'] if name in sys.modules]
+'''
+
+# Routines and classes and the sub-modules they are loaded from.
+_lazy_names = {'plot': 'plot1d', 'plot_many': 'plot1d', 'PathLine': 'plot1d',
+               'mesh': 'plot2d', 'Surface': 'plot2d',
+               'vol': 'plot3d', 'Volume': 'plot3d', 'transfer_function': 'plot3d',
+               'transfer_function_max': 'plot3d', 'quiver': 'plot3d',
+               'Quiver3d': 'plot3d', 'contour': 'plot3d', 'Contour3d': 'plot3d',
+               'streamlines': 'streamlines', 'Streamlines3d': 'streamlines',
+               'vec': 'vectors', 'arrow': 'vectors',
+               'ColorMapper': 'colors', 'make_rgba_array': 'colors',
+               'string_to_rgba': 'colors', 'strings_to_rgba': 'colors',
+               'colormap_lut': 'colors', 'map_colors': 'colors', 'quantize': 'colors',
+               'data_range': 'colors', 'normalize': 'colors'}
+
+# Sub-modules which can be accessed as attributes. The module streamlines is
+# shadowed by its routine and can be imported as blendaviz.streamlines.
+_sub_modules = ('backends', 'colors', 'geometry', 'isosurface', 'markers', 'plot1d', 'plot2d',
+                'plot3d', 'vectors')
+
+
+def __getattr__(name):
+    """
+    Import the sub-module of a routine, class or sub-module on first access.
+    """
+
+    import importlib
+
+    if name in _lazy_names:
+        module = importlib.import_module('.' + _lazy_names[name], __name__)
+        # Cache all names of the module. This also replaces the module
+        # streamlines, which the import sets as attribute, by the routine.
+        for lazy_name, module_name in _lazy_names.items():
+            if module_name == _lazy_names[name]:
+                globals()[lazy_name] = getattr(module, lazy_name)
+        return globals()[name]
+    if name in _sub_modules:
+        return globals().setdefault(name, importlib.import_module('.' + name, __name__))
+    raise AttributeError("module '{0}' has no attribute '{1}'".format(__name__, name))
+
 
-# Load sub-modules.
-from .plot1d import *
-from .plot2d import *
-from .plot3d import *
-from .streamilnes import *
-from .colors import *
-from .vectors import *
+def __dir__():
+    """
+    List the lazily loaded names together with the loaded ones.
+    """
 
+    return sorted(set(globals()) | set(_lazy_names) | set(_sub_modules))
@@ -0,0 +1,963 @@
+# backends.py
+"""
+Contains the backends which turn geometry arrays into scene objects.
+The Blender backend uploads them with bulk calls, the headless backend
+only records them, so the array computations can be run and profiled
+without Blender.
+
+Created on Thu Mar 12 10:00:00 2020
+
+@author: Simon Candelaresi
+"""
+
+
+'''
+Test:
+import numpy as np
+import blendaviz as blt
+from blendaviz import backends
+backends.set_backend('headless')
+x, y = np.meshgrid(np.linspace(-3, 3, 500), np.linspace(-3, 3, 500), indexing='ij')
+z = np.exp(-(x**2 + y**2))
+vertex_index, loops, loop_total, info = blt.geometry.quadtree_faces(x, y, z, tolerance=1e-3)
+vertices = np.stack([x.ravel(), y.ravel(), z.ravel()], axis=-1)
+mesh_object = blt.geometry.new_mesh('ObjMesh', vertices, loops, loop_total)
+blt.geometry.set_attribute(mesh_object.data, 'Color', np.random.random([vertices.shape[0], 4]))
+print(backends.get_backend().records)
+backends.set_backend('blender')
+'''
+
+def get_backend():
+    """
+    Return the active backend.
+    """
+
+    return _backend[0]
+
+
+def set_backend(backend):
+    """
+    Set the active backend.
+
+    call signature:
+
+    set_backend(backend):
+
+    Keyword arguments:
+
+    *backend*:
+      'blender', 'headless' or a backend object.
+    """
+
+    if backend == 'blender':
+        backend = BlenderBackend()
+    elif backend == 'headless':
+        backend = HeadlessBackend()
+    elif isinstance(backend, str):
+        print("Error: backend must be 'blender' or 'headless'.")
+        return -1
+    _backend[0] = backend
+
+    return 0
+
+
+class BlenderBackend(object):
+    """
+    Backend which creates Blender objects from the geometry arrays.
+    """
+
+    def new_mesh(self, name, vertices, faces, loop_total=None, link=True):
+        """
+        Create a mesh object from vertex and face arrays and link it with the scene.
+        All data is written with a single foreach_set call per attribute.
+
+        call signature:
+
+        new_mesh(name, vertices, faces, loop_total=None, link=True):
+
+        Keyword arguments:
+
+        *name*:
+          Name of the mesh data and object.
+
+        *vertices*:
+          Array of shape [n_vertices, 3] with the vertex coordinates.
+
+        *faces*:
+          Integer array of shape [n_faces, n_corners] with the vertex indices of
+          the faces or, if loop_total is given, flat array with the vertex indices
+          of all faces one after the other.
+
+        *loop_total*:
+          Integer array with the number of vertices of each face for faces
+          with different numbers of vertices.
+
+        *link*:
+          If False, do not link the object with the scene, e.g. for templates
+          which are only shown through their instances.
+        """
+
+        import bpy
+        import numpy as np
+
+        vertices = np.asarray(vertices, dtype=np.float32).reshape(-1, 3)
+        faces = np.asarray(faces, dtype=np.int32)
+        if loop_total is None:
+            loop_total = np.full(faces.shape[0], faces.shape[-1], dtype=np.int32)
+            faces = faces.reshape(-1)
+        loop_total = np.asarray(loop_total, dtype=np.int32)
+        loop_start = np.zeros(loop_total.size, dtype=np.int32)
+        loop_start[1:] = np.cumsum(loop_total)[:-1]
+
+        # Write the vertices, loops and polygons.
+        mesh_data = bpy.data.meshes.new(name)
+        mesh_data.vertices.add(vertices.shape[0])
+        mesh_data.vertices.foreach_set('co', vertices.ravel())
+        mesh_data.loops.add(faces.size)
+        mesh_data.loops.foreach_set('vertex_index', faces)
+        mesh_data.polygons.add(loop_total.size)
+        mesh_data.polygons.foreach_set('loop_start', loop_start)
+        # Newer Blender versions derive the loop totals from the loop starts.
+        if not bpy.types.MeshPolygon.bl_rna.properties['loop_total'].is_readonly:
+            mesh_data.polygons.foreach_set('loop_total', loop_total)
+        mesh_data.update(calc_edges=True)
+
+        # Create the object and link it with the scene.
+        mesh_object = bpy.data.objects.new(name, mesh_data)
+        if link:
+            bpy.context.scene.collection.objects.link(mesh_object)
+
+        return mesh_object
+
+
+    def set_attribute(self, mesh_data, name, values, data_type='FLOAT_COLOR', domain='POINT'):
+        """
+        Write an attribute of a mesh with a single foreach_set call.
+        The attribute is created if it does not exist yet.
+
+        call signature:
+
+        set_attribute(mesh_data, name, values, data_type='FLOAT_COLOR', domain='POINT'):
+
+        Keyword arguments:
+
+        *mesh_data*:
+          Blender mesh data.
+
+        *name*:
+          Name of the attribute.
+
+        *values*:
+          Array with one value for each element of the domain, e.g. of shape
+          [n_vertices, 4] for colors.
+
+        *data_type*:
+          Blender attribute type, e.g. 'FLOAT_COLOR', 'FLOAT' or 'FLOAT_VECTOR'.
+
+        *domain*:
+          Blender attribute domain, e.g. 'POINT' or 'FACE'.
+        """
+
+        import numpy as np
+
+        attribute = mesh_data.attributes.get(name)
+        if attribute is None or attribute.data_type != data_type or attribute.domain != domain:
+            if not attribute is None:
+                mesh_data.attributes.remove(attribute)
+            attribute = mesh_data.attributes.new(name, data_type, domain)
+        value_name = {'FLOAT_COLOR': 'color', 'FLOAT_VECTOR': 'vector'}.get(data_type, 'value')
+        attribute.data.foreach_set(value_name, np.asarray(values, dtype=np.float32).ravel())
+
+        return attribute
+
+
+    def instance_on_points(self, name, points, template_object, attributes=None,
+                           rotation_attribute=None, scale_attribute=None):
+        """
+        Create a point cloud object which shows an instance of the template
+        object on every point through a geometry nodes modifier.
+        Point attributes are passed on to the instances and can be read by
+        their materials with an instancer Attribute node.
+
+        call signature:
+
+        instance_on_points(name, points, template_object, attributes=None,
+                           rotation_attribute=None, scale_attribute=None):
+
+        Keyword arguments:
+
+        *name*:
+          Name of the point cloud object and of the node group.
+
+        *points*:
+          Array of shape [n_points, 3] with the instance locations.
+
+        *template_object*:
+          Blender object which is instanced.
+
+        *attributes*:
+          Dictionary of attribute names and (values, data_type) pairs, see set_attribute.
+
+        *rotation_attribute*:
+          Name of the FLOAT_VECTOR attribute with the Euler angles of the instances.
+
+        *scale_attribute*:
+          Name of the attribute with the scale of the instances.
+        """
+
+        import bpy
+        import numpy as np
+
+        point_object = self.new_mesh(name, points, np.zeros([0, 3]))
+        if not attributes is None:
+            for attribute_name, (values, data_type) in attributes.items():
+                self.set_attribute(point_object.data, attribute_name, values, data_type)
+
+        # Create the node group with the geometry input and output.
+        node_group = bpy.data.node_groups.new(name, 'GeometryNodeTree')
+        if hasattr(node_group, 'interface'):
+            node_group.interface.new_socket(name='Geometry', in_out='INPUT',
+                                            socket_type='NodeSocketGeometry')
+            node_group.interface.new_socket(name='Geometry', in_out='OUTPUT',
+                                            socket_type='NodeSocketGeometry')
+        else:
+            node_group.inputs.new('NodeSocketGeometry', 'Geometry')
+            node_group.outputs.new('NodeSocketGeometry', 'Geometry')
+        nodes = node_group.nodes
+        links = node_group.links
+        node_input = nodes.new('NodeGroupInput')
+        node_output = nodes.new('NodeGroupOutput')
+        node_instance = nodes.new('GeometryNodeInstanceOnPoints')
+        node_object = nodes.new('GeometryNodeObjectInfo')
+        node_object.inputs['Object'].default_value = template_object
+        links.new(node_input.outputs[0], node_instance.inputs['Points'])
+        links.new(node_object.outputs['Geometry'], node_instance.inputs['Instance'])
+        links.new(node_instance.outputs['Instances'], node_output.inputs[0])
+
+        # Read the rotation and scale of the instances from the point attributes.
+        for attribute_name, data_type, socket_name in [(rotation_attribute, 'FLOAT_VECTOR', 'Rotation'),
+                                                       (scale_attribute, 'FLOAT', 'Scale')]:
+            if attribute_name is None:
+                continue
+            node_attribute = nodes.new('GeometryNodeInputNamedAttribute')
+            node_attribute.data_type = data_type
+            node_attribute.inputs['Name'].default_value = attribute_name
+            # The output sockets differ between Blender versions.
+            output = [socket for socket in node_attribute.outputs if socket.enabled][0]
+            links.new(output, node_instance.inputs[socket_name])
+
+        modifier = point_object.modifiers.new(name, 'NODES')
+        modifier.node_group = node_group
+
+        return point_object
+
+
+    def set_uv(self, mesh_data, uv, name='UVMap'):
+        """
+        Write the uv coordinates of all loops of a mesh with a single foreach_set call.
+        """
+
+        import numpy as np
+
+        uv_layer = mesh_data.uv_layers.new(name=name)
+        uv_layer.data.foreach_set('uv', np.asarray(uv, dtype=np.float32).ravel())
+
+
+    def set_vertices(self, mesh_data, vertices):
+        """
+        Overwrite the vertex coordinates of a mesh with a single foreach_set call.
+        """
+
+        import numpy as np
+
+        mesh_data.vertices.foreach_set('co', np.asarray(vertices, dtype=np.float32).ravel())
+        mesh_data.update()
+
+
+    def add_shape_key(self, mesh_object, vertices, frame):
+        """
+        Store the vertices as shape key which is only active at the given frame.
+        """
+
+        import numpy as np
+
+        if mesh_object.data.shape_keys is None:
+            mesh_object.shape_key_add(name='Basis', from_mix=False)
+        shape_key = mesh_object.shape_key_add(name='Frame {0}'.format(frame), from_mix=False)
+        shape_key.data.foreach_set('co', np.asarray(vertices, dtype=np.float32).ravel())
+        for key_frame, value in [(frame-1, 0), (frame, 1), (frame+1, 0)]:
+            shape_key.value = value
+            shape_key.keyframe_insert('value', frame=key_frame)
+        mesh_object.data.update()
+
+
+    def mesh_arrays(self, mesh_object):
+        """
+        Return the vertices, face loops and number of vertices of each face
+        of a mesh object, or None if the object is not a mesh.
+        The vertices are rotated and scaled as the object, but not moved.
+        """
+
+        import numpy as np
+        from . import markers
+
+        if not mesh_object.type == 'MESH':
+            return None
+        vertices, loops, loop_total = markers.mesh_arrays(mesh_object)
+        matrix = np.array(mesh_object.matrix_world, dtype=np.float64)[:3, :3]
+
+        return vertices @ matrix.T, loops, loop_total
+
+
+    def update(self, data):
+        """
+        Tag mesh data as changed, so that it is redrawn.
+        """
+
+        data.update()
+
+
+    def new_curve(self, name, points, radius, resolution):
+        """
+        Create a poly line curve with a round bevel and link it with the scene.
+        The origin of the object is the last point.
+
+        call signature:
+
+        new_curve(name, points, radius, resolution):
+
+        Keyword arguments:
+
+        *name*:
+          Name of the curve data and object.
+
+        *points*:
+          Array of shape [n_points, 3] with the points of the line.
+
+        *radius*:
+          Radius of the bevel, i.e. line width.
+
+        *resolution*:
+          Resolution of the bevel.
+        """
+
+        import bpy
+        import numpy as np
+
+        points = np.asarray(points, dtype=np.float64).reshape(-1, 3)
+        curve_data = bpy.data.curves.new(name, type='CURVE')
+        curve_data.dimensions = '3D'
+        curve_object = bpy.data.objects.new(name, curve_data)
+        curve_object.location = tuple(points[-1])
+
+        # Write the points relative to the origin at once.
+        poly_line = curve_data.splines.new('POLY')
+        poly_line.points.add(points.shape[0] - 1)
+        coordinates = np.zeros([points.shape[0], 4], dtype=np.float32)
+        coordinates[:, :3] = points - points[-1]
+        poly_line.points.foreach_set('co', coordinates.ravel())
+
+        # Add 3d structure.
+        curve_data.bevel_depth = radius
+        curve_data.bevel_resolution = resolution
+        curve_data.fill_mode = 'FULL'
+        bpy.context.scene.collection.objects.link(curve_object)
+
+        return curve_object
+
+
+    def append_curve_points(self, curve_object, points, start):
+        """
+        Write points into the poly line of a curve from the index start on.
+        Blender draws every point of a spline, so it grows by exactly the
+        number of missing points. The coordinates are written with one
+        foreach_set call instead of a Python loop over the points.
+        """
+
+        import numpy as np
+
+        poly_line = curve_object.data.splines[0]
+        points = np.asarray(points, dtype=np.float64).reshape(-1, 3)
+        missing = start + points.shape[0] - len(poly_line.points)
+        if missing > 0:
+            poly_line.points.add(missing)
+
+        # foreach_set writes the whole collection, so the existing points
+        # are read back in bulk and only the new ones are replaced.
+        coordinates = np.empty(len(poly_line.points)*4, dtype=np.float32)
+        poly_line.points.foreach_get('co', coordinates)
+        coordinates = coordinates.reshape(-1, 4)
+        coordinates[start:start+points.shape[0], :3] = points - np.array(curve_object.location)
+        coordinates[start:start+points.shape[0], 3] = 0
+        poly_line.points.foreach_set('co', coordinates.ravel())
+
+
+    def new_material(self, name, color=(1, 1, 1, 1), roughness=1, emission=None, blend=False,
+                     attribute_type='GEOMETRY', color_attribute=None, attribute_alpha=False,
+                     roughness_attribute=None, emission_attribute=None, image=None):
+        """
+        Create a surface material with a fixed color or a color read from an
+        attribute or image, and optional light emission.
+
+        call signature:
+
+        new_material(name, color=(1, 1, 1, 1), roughness=1, emission=None, blend=False,
+                     attribute_type='GEOMETRY', color_attribute=None, attribute_alpha=False,
+                     roughness_attribute=None, emission_attribute=None, image=None):
+
+        Keyword arguments:
+
+        *name*:
+          Name of the material.
+
+        *color, roughness, emission*:
+          Fixed rgba color, roughness and emission strength.
+          No emission if emission and emission_attribute are None.
+
+        *blend*:
+          If True, blend the transparent material with the background.
+
+        *attribute_type*:
+          Type of the Attribute nodes, 'GEOMETRY' for the attributes of the
+          mesh or 'INSTANCER' for the attributes of the instancing points.
+
+        *color_attribute, roughness_attribute, emission_attribute*:
+          Names of the attributes replacing the fixed values.
+
+        *attribute_alpha*:
+          If True, also read the alpha value from the color attribute.
+
+        *image*:
+          Image mapped onto the UV coordinates as color.
+        """
+
+        import bpy
+
+        mesh_material = bpy.data.materials.new(name)
+        mesh_material.diffuse_color = tuple(color)
+        mesh_material.roughness = roughness
+        if blend:
+            mesh_material.blend_method = 'BLEND'
+        if (color_attribute is None and roughness_attribute is None and image is None
+                and emission is None and emission_attribute is None):
+            return mesh_material
+
+        mesh_material.use_nodes = True
+        node_tree = mesh_material.node_tree
+        nodes = node_tree.nodes
+        node_bsdf = nodes.get('Principled BSDF')
+        node_output = nodes.get('Material Output')
+
+        # Read the values from attributes and images.
+        def attribute_node(attribute_name):
+            node_attribute = nodes.new('ShaderNodeAttribute')
+            node_attribute.attribute_type = attribute_type
+            node_attribute.attribute_name = attribute_name
+            return node_attribute
+        color_socket = None
+        if not color_attribute is None:
+            node_color = attribute_node(color_attribute)
+            color_socket = node_color.outputs['Color']
+            if attribute_alpha:
+                node_tree.links.new(node_color.outputs['Alpha'], node_bsdf.inputs['Alpha'])
+        if not image is None:
+            node_texture = nodes.new('ShaderNodeTexImage')
+            node_texture.image = image
+            color_socket = node_texture.outputs['Color']
+        if color_socket is None:
+            node_bsdf.inputs['Base Color'].default_value = tuple(color)
+        else:
+            node_tree.links.new(color_socket, node_bsdf.inputs['Base Color'])
+        if roughness_attribute is None:
+            node_bsdf.inputs['Roughness'].default_value = roughness
+        else:
+            node_tree.links.new(attribute_node(roughness_attribute).outputs['Fac'],
+                                node_bsdf.inputs['Roughness'])
+
+        # Replace the diffusive BSDF node by an emission node.
+        if not emission is None or not emission_attribute is None:
+            nodes.remove(node_bsdf)
+            node_emission = nodes.new(type='ShaderNodeEmission')
+            node_tree.links.new(node_emission.outputs['Emission'], node_output.inputs['Surface'])
+            if color_socket is None:
+                node_emission.inputs['Color'].default_value = tuple(color)
+            else:
+                node_tree.links.new(color_socket, node_emission.inputs['Color'])
+            if emission_attribute is None:
+                node_emission.inputs['Strength'].default_value = emission
+            else:
+                node_tree.links.new(attribute_node(emission_attribute).outputs['Fac'],
+                                    node_emission.inputs['Strength'])
+
+        return mesh_material
+
+
+    def get_material(self, name):
+        """
+        Return the material of the given name or None.
+        """
+
+        import bpy
+
+        return bpy.data.materials.get(name)
+
+
+    def new_volume_material(self, name, image, nx, palette_image=None):
+        """
+        Create the volume material which reads the voxels from an image.
+
+        call signature:
+
+        new_volume_material(name, image, nx, palette_image=None):
+
+        Keyword arguments:
+
+        *name*:
+          Name of the material.
+
+        *image*:
+          Image with the stacked x-slices of the voxels, see new_image.
+
+        *nx*:
+          Number of x-slices in the image.
+
+        *palette_image*:
+          Image with the palette colors if the voxels are stored as palette indices.
+        """
+
+        import bpy
+
+        mesh_material = bpy.data.materials.new(name)
+        mesh_material.use_nodes = True
+
+        # Add the RGB and emission values to the material.
+        node_tree = mesh_material.node_tree
+        nodes = node_tree.nodes
+        # Remove diffusive BSDF node.
+        nodes.remove(nodes[1])
+        # Map the generated coordinates onto the stacked x-slices.
+        node_coordinates = nodes.new(type='ShaderNodeTexCoord')
+        node_separate = nodes.new(type='ShaderNodeSeparateXYZ')
+        node_tree.links.new(node_coordinates.outputs['Generated'], node_separate.inputs[0])
+        node_slice = nodes.new(type='ShaderNodeMath')
+        node_slice.operation = 'MULTIPLY'
+        node_slice.inputs[1].default_value = nx
+        node_tree.links.new(node_separate.outputs['X'], node_slice.inputs[0])
+        node_floor = nodes.new(type='ShaderNodeMath')
+        node_floor.operation = 'FLOOR'
+        node_tree.links.new(node_slice.outputs[0], node_floor.inputs[0])
+        node_clamp = nodes.new(type='ShaderNodeMath')
+        node_clamp.operation = 'MINIMUM'
+        node_clamp.inputs[1].default_value = nx - 1
+        node_tree.links.new(node_floor.outputs[0], node_clamp.inputs[0])
+        node_row = nodes.new(type='ShaderNodeMath')
+        node_row.operation = 'ADD'
+        node_tree.links.new(node_clamp.outputs[0], node_row.inputs[0])
+        node_tree.links.new(node_separate.outputs['Y'], node_row.inputs[1])
+        node_v = nodes.new(type='ShaderNodeMath')
+        node_v.operation = 'DIVIDE'
+        node_v.inputs[1].default_value = nx
+        node_tree.links.new(node_row.outputs[0], node_v.inputs[0])
+        node_uv = nodes.new(type='ShaderNodeCombineXYZ')
+        node_tree.links.new(node_separate.outputs['Z'], node_uv.inputs['X'])
+        node_tree.links.new(node_v.outputs[0], node_uv.inputs['Y'])
+        # Add the RGB source node.
+        node_texture = nodes.new(type='ShaderNodeTexImage')
+        node_texture.image = image
+        node_texture.interpolation = 'Closest'
+        node_texture.extension = 'EXTEND'
+        node_tree.links.new(node_uv.outputs[0], node_texture.inputs['Vector'])
+        # Look up the palette colors from the palette indices.
+        if not palette_image is None:
+            node_index = nodes.new(type='ShaderNodeMath')
+            node_index.operation = 'MULTIPLY_ADD'
+            node_index.inputs[1].default_value = 255/256
+            node_index.inputs[2].default_value = 0.5/256
+            node_tree.links.new(node_texture.outputs['Color'], node_index.inputs[0])
+            node_palette_uv = nodes.new(type='ShaderNodeCombineXYZ')
+            node_palette_uv.inputs['Y'].default_value = 0.5
+            node_tree.links.new(node_index.outputs[0], node_palette_uv.inputs['X'])
+            node_texture = nodes.new(type='ShaderNodeTexImage')
+            node_texture.image = palette_image
+            node_texture.interpolation = 'Closest'
+            node_texture.extension = 'EXTEND'
+            node_tree.links.new(node_palette_uv.outputs[0], node_texture.inputs['Vector'])
+        # Link the RGB output to the emission shader color input.
+        node_emission = nodes.new(type='ShaderNodeEmission')
+        node_emission.inputs['Strength'].default_value = 1
+        node_tree.links.new(node_texture.outputs['Color'], node_emission.inputs['Color'])
+        # Link the opacity to the absorption density.
+        node_absorption = nodes.new(type='ShaderNodeVolumeAbsorption')
+        node_absorption.inputs['Color'].default_value = (0, 0, 0, 1)
+        node_tree.links.new(node_texture.outputs['Alpha'], node_absorption.inputs['Density'])
+        # Link the shaders to the material output.
+        node_add = nodes.new(type='ShaderNodeAddShader')
+        node_tree.links.new(node_emission.outputs['Emission'], node_add.inputs[0])
+        node_tree.links.new(node_absorption.outputs['Volume'], node_add.inputs[1])
+        node_tree.links.new(node_add.outputs['Shader'], nodes[0].inputs['Volume'])
+
+        return mesh_material
+
+
+    def assign_material(self, scene_object, material):
+        """
+        Append a material to the materials of an object.
+        """
+
+        scene_object.data.materials.append(material)
+
+
+    def new_image(self, name, width, height, pixels=None, alpha=True, float_buffer=True,
+                  non_color=False):
+        """
+        Create an image and write its pixels with a single foreach_set call.
+
+        call signature:
+
+        new_image(name, width, height, pixels=None, alpha=True, float_buffer=True,
+                  non_color=False):
+
+        Keyword arguments:
+
+        *name*:
+          Name of the image.
+
+        *width, height*:
+          Size of the image in pixels.
+
+        *pixels*:
+          Array of the rgba values of shape [height, width, 4] or [height*width, 4].
+
+        *alpha, float_buffer*:
+          Store an alpha channel and float values instead of bytes.
+          Float images with alpha store the channels independently.
+
+        *non_color*:
+          If True, do not apply a color space to the values.
+        """
+
+        import bpy
+
+        image = bpy.data.images.new(name, width, height, alpha=alpha, float_buffer=float_buffer)
+        if non_color:
+            image.colorspace_settings.name = 'Non-Color'
+        if alpha and float_buffer:
+            image.alpha_mode = 'CHANNEL_PACKED'
+        if not pixels is None:
+            self.set_pixels(image, pixels)
+
+        return image
+
+
+    def set_pixels(self, image, pixels):
+        """
+        Overwrite the pixels of an image with a single foreach_set call.
+        Blender only accepts float32 values.
+        """
+
+        import numpy as np
+
+        image.pixels.foreach_set(np.asarray(pixels, dtype=np.float32).ravel())
+
+
+    def remove(self, item):
+        """
+        Remove an object together with its data and node groups, a material
+        or an image.
+        """
+
+        import bpy
+
+        if isinstance(item, bpy.types.Object):
+            for modifier in item.modifiers:
+                if modifier.type == 'NODES' and not modifier.node_group is None:
+                    bpy.data.node_groups.remove(modifier.node_group)
+            data = item.data
+            bpy.data.objects.remove(item)
+            if isinstance(data, bpy.types.Mesh) and data.users == 0:
+                bpy.data.meshes.remove(data)
+            elif isinstance(data, bpy.types.Curve) and data.users == 0:
+                bpy.data.curves.remove(data)
+        elif isinstance(item, bpy.types.Material):
+            bpy.data.materials.remove(item)
+        elif isinstance(item, bpy.types.Image):
+            bpy.data.images.remove(item)
+
+
+    def redraw(self):
+        """
+        Redraw the Blender windows.
+        """
+
+        import bpy
+
+        bpy.ops.wm.redraw_timer(type='DRAW_WIN_SWAP', iterations=1)
+
+
+class HeadlessBackend(object):
+    """
+    Backend which records the geometry arrays, materials and images in memory
+    instead of creating Blender objects. It has the methods of BlenderBackend.
+    """
+
+    def __init__(self):
+        """
+        Fill members with default values.
+        """
+
+        self.records = []
+
+
+    def new_mesh(self, name, vertices, faces, loop_total=None, link=True):
+        """
+        Record a mesh.
+        """
+
+        import numpy as np
+
+        vertices = np.array(vertices, dtype=np.float32).reshape(-1, 3)
+        faces = np.asarray(faces, dtype=np.int32)
+        if loop_total is None:
+            loop_total = np.full(faces.shape[0], faces.shape[-1], dtype=np.int32)
+            faces = faces.reshape(-1)
+        return self.__record('MESH', name, vertices=vertices, loops=faces,
+                             loop_total=np.asarray(loop_total, dtype=np.int32), link=link)
+
+
+    def set_attribute(self, mesh_data, name, values, data_type='FLOAT_COLOR', domain='POINT'):
+        """
+        Record an attribute.
+        """
+
+        import numpy as np
+
+        attribute = (np.array(values, dtype=np.float32), data_type, domain)
+        mesh_data.attributes[name] = attribute
+
+        return attribute
+
+
+    def set_uv(self, mesh_data, uv, name='UVMap'):
+        """
+        Record the uv coordinates of all loops.
+        """
+
+        import numpy as np
+
+        mesh_data.uv_layers[name] = np.array(uv, dtype=np.float32).reshape(-1, 2)
+
+
+    def set_vertices(self, mesh_data, vertices):
+        """
+        Record new vertex coordinates.
+        """
+
+        import numpy as np
+
+        mesh_data.vertices = np.array(vertices, dtype=np.float32).reshape(-1, 3)
+
+
+    def add_shape_key(self, mesh_object, vertices, frame):
+        """
+        Record the vertices of a frame.
+        """
+
+        import numpy as np
+
+        mesh_object.shape_keys[frame] = np.array(vertices, dtype=np.float32).reshape(-1, 3)
+
+
+    def mesh_arrays(self, mesh_object):
+        """
+        Return the recorded vertices, face loops and number of vertices of
+        each face, or None if the record is not a mesh.
+        """
+
+        import numpy as np
+
+        if not getattr(mesh_object, 'kind', None) == 'MESH':
+            return None
+        return (mesh_object.vertices.astype(np.float64), mesh_object.loops.astype(np.int64),
+                mesh_object.loop_total.astype(np.int64))
+
+
+    def update(self, data):
+        """
+        Nothing needs to be redrawn.
+        """
+
+        pass
+
+
+    def instance_on_points(self, name, points, template_object, attributes=None,
+                           rotation_attribute=None, scale_attribute=None):
+        """
+        Record instances on points.
+        """
+
+        import numpy as np
+
+        point_object = self.new_mesh(name, points, np.zeros([0, 3]))
+        if not attributes is None:
+            for attribute_name, (values, data_type) in attributes.items():
+                self.set_attribute(point_object, attribute_name, values, data_type)
+        point_object.instance = (template_object, rotation_attribute, scale_attribute)
+
+        return point_object
+
+
+    def new_curve(self, name, points, radius, resolution):
+        """
+        Record a poly line curve.
+        """
+
+        import numpy as np
+
+        return self.__record('CURVE', name, points=np.array(points, dtype=np.float64).reshape(-1, 3),
+                             radius=radius, resolution=resolution)
+
+
+    def append_curve_points(self, curve_object, points, start):
+        """
+        Record points of a curve from the index start on.
+        """
+
+        import numpy as np
+
+        curve_object.points = np.concatenate([curve_object.points[:start],
+                                              np.asarray(points, dtype=np.float64).reshape(-1, 3)])
+
+
+    def new_material(self, name, color=(1, 1, 1, 1), roughness=1, emission=None, blend=False,
+                     attribute_type='GEOMETRY', color_attribute=None, attribute_alpha=False,
+                     roughness_attribute=None, emission_attribute=None, image=None):
+        """
+        Record a surface material.
+        """
+
+        return self.__record('MATERIAL', name, color=tuple(color), roughness=roughness,
+                             emission=emission, blend=blend, attribute_type=attribute_type,
+                             color_attribute=color_attribute, attribute_alpha=attribute_alpha,
+                             roughness_attribute=roughness_attribute,
+                             emission_attribute=emission_attribute, image=image)
+
+
+    def get_material(self, name):
+        """
+        Return the recorded material of the given name or None.
+        """
+
+        for record in self.records:
+            if record.kind == 'MATERIAL' and record.name == name:
+                return record
+        return None
+
+
+    def new_volume_material(self, name, image, nx, palette_image=None):
+        """
+        Record a volume material.
+        """
+
+        return self.__record('MATERIAL', name, image=image, nx=nx, palette_image=palette_image)
+
+
+    def assign_material(self, scene_object, material):
+        """
+        Record the material of an object.
+        """
+
+        scene_object.materials.append(material)
+
+
+    def new_image(self, name, width, height, pixels=None, alpha=True, float_buffer=True,
+                  non_color=False):
+        """
+        Record an image.
+        """
+
+        image = self.__record('IMAGE', name, width=width, height=height, pixels=None,
+                              alpha=alpha, float_buffer=float_buffer, non_color=non_color)
+        if not pixels is None:
+            self.set_pixels(image, pixels)
+
+        return image
+
+
+    def set_pixels(self, image, pixels):
+        """
+        Record the pixels of an image.
+        """
+
+        import numpy as np
+
+        image.pixels = np.array(pixels, dtype=np.float32).reshape(image.height, image.width, 4)
+
+
+    def remove(self, item):
+        """
+        Forget a record.
+        """
+
+        if item in self.records:
+            self.records.remove(item)
+
+
+    def redraw(self):
+        """
+        Nothing needs to be redrawn.
+        """
+
+        pass
+
+
+    def __record(self, kind, name, **properties):
+        """
+        Create a record and keep it.
+        """
+
+        record = Record(kind, name, **properties)
+        self.records.append(record)
+
+        return record
+
+
+class Record(object):
+    """
+    Object, material or image recorded by the headless backend. The record
+    is its own data, as Blender objects and their mesh data.
+    """
+
+    def __init__(self, kind, name, **properties):
+        """
+        Fill members with the recorded properties.
+        """
+
+        self.kind = kind
+        self.name = name
+        self.attributes = {}
+        self.uv_layers = {}
+        self.shape_keys = {}
+        self.materials = []
+        self.instance = None
+        self.data = self
+        for key, value in properties.items():
+            setattr(self, key, value)
+
+
+    def __repr__(self):
+        """
+        Summarize the record with the shapes of its arrays.
+        """
+
+        import numpy as np
+
+        arrays = ['{0} {1}'.format(key, list(value.shape)) for key, value in vars(self).items()
+                  if isinstance(value, np.ndarray)]
+        arrays += ['attributes {0}'.format(sorted(self.attributes))] if self.attributes else []
+
+        return "Record('{0}', '{1}'{2})".format(self.kind, self.name,
+                                                ''.join(', ' + array for array in arrays))
+
+
+# Active backend in a list, so that it can be replaced.
+_backend = [BlenderBackend()]
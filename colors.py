@@ -7,57 +7,84 @@ Created on Mon Aug 27 18:00:35 2018
 @author: Simon Candelaresi
 """
 
+
+'''
+Test:
+import sys
+import time
+start = time.perf_counter()
+import blendaviz.colors
+lut = blendaviz.colors.colormap_lut('viridis')
+print(time.perf_counter() - start, 'matplotlib' in sys.modules)
+'''
+
 def string_to_rgba(color_string):
     """
-    Converts a color string or character into an rgb value.
+    Converts a color string, character or hex code into an rgba value.
 
     call signature:
 
-    string_to_rgb(color_string):
+    string_to_rgba(color_string):
 
     Keyword arguments:
 
     *color_string*:
-      Any valid color string or character.
-    """
-
-    if color_string == 'b':
-        rgba = (0, 0, 1, 1)
-    if color_string == 'g':
-        rgba = (0, 1, 0, 1)
-    if color_string == 'r':
-        rgba = (1, 0, 0, 1)
-    if color_string == 'c':
-        rgba = (0, 1, 1, 1)
-    if color_string == 'm':
-        rgba = (1, 0, 1, 1)
-    if color_string == 'y':
-        rgba = (1, 1, 0, 1)
-    if color_string == 'k':
-        rgba = (0, 0, 0, 1)
-    if color_string == 'w':
-        rgba = (1, 1, 1, 1)
-
-    if color_string == 'blue':
-        rgba = (0, 0, 1, 1)
-    if color_string == 'green':
-        rgba = (0, 1, 0, 1)
-    if color_string == 'red':
-        rgba = (1, 0, 0, 1)
-    if color_string == 'cyan':
-        rgba = (0, 1, 1, 1)
-    if color_string == 'magenta':
-        rgba = (1, 0, 1, 1)
-    if color_string == 'yellow':
-        rgba = (1, 1, 0, 1)
-    if color_string == 'black':
-        rgba = (0, 0, 0, 1)
-    if color_string == 'white':
-        rgba = (1, 1, 1, 1)
+      Any valid color string or character, e.g. 'red', 'r', 'tab:blue'
+      or '#ff0000', '#ff000080', '#f00'.
+    """
 
+    color_string = color_string.strip().lower()
+    if color_string in _rgba_cache:
+        return _rgba_cache[color_string]
+
+    hex_code = NAMED_COLORS.get(color_string, color_string)
+    if hex_code.startswith('#') and len(hex_code) in [4, 5]:
+        hex_code = '#' + ''.join(2*digit for digit in hex_code[1:])
+    if not hex_code.startswith('#') or not len(hex_code) in [7, 9]:
+        print("Error: unknown color '{0}'.".format(color_string))
+        return -1
+    try:
+        rgba = tuple(int(hex_code[index:index+2], 16)/255
+                     for index in range(1, len(hex_code), 2))
+    except ValueError:
+        print("Error: unknown color '{0}'.".format(color_string))
+        return -1
+    if len(rgba) == 3:
+        rgba = rgba + (1,)
+
+    _rgba_cache[color_string] = rgba
     return rgba
 
 
+def strings_to_rgba(color_strings):
+    """
+    Converts a list or array of color strings into an [n, 4] array of rgba
+    values. Every distinct string is converted only once.
+
+    call signature:
+
+    strings_to_rgba(color_strings):
+
+    Keyword arguments:
+
+    *color_strings*:
+      List or 1d array of valid color strings or characters.
+    """
+
+    import numpy as np
+
+    unique_strings, inverse = np.unique(np.asarray(color_strings, dtype=str),
+                                        return_inverse=True)
+    palette = np.empty([unique_strings.size, 4])
+    for string_index, color_string in enumerate(unique_strings):
+        rgba = string_to_rgba(color_string)
+        if rgba == -1:
+            return -1
+        palette[string_index] = rgba
+
+    return palette[inverse.ravel()]
+
+
 def make_rgba_array(color, length, color_map=None, vmin=None, vmax=None):
     """
     Creates an rgb array for the civen color, which can be rgb, scalar array
@@ -77,7 +104,8 @@ def make_rgba_array(color, length, color_map=None, vmin=None, vmax=None):
 
     *color_map*:
       Color map for the values.
-      These are the same as in matplotlib.
+      These are the same as in matplotlib, or a ColorMapper, which keeps
+      its own range.
 
     *vmin, vmax*
       Minimum and maximum values for the colormap. If not specify, determine
@@ -85,18 +113,20 @@ def make_rgba_array(color, length, color_map=None, vmin=None, vmax=None):
     """
 
     import numpy as np
-    import matplotlib.cm as cm
+
+    # Transform array of color strings into rgba.
+    if isinstance(color, np.ndarray) and color.dtype.kind in 'US':
+        if color.size != length:
+            return -1
+        return strings_to_rgba(color)
 
     # Assign the colormap to the rgb values.
     if isinstance(color, np.ndarray):
         if color.ndim == 1:
-            if color_map is None:
-                color_map = cm.viridis
-            if vmin is None:
-                vmin = color.min()
-            if vmax is None:
-                vmax = color.max()
-            color_rgba = color_map((color - vmin)/(vmax - vmin))[:, :]
+            if isinstance(color_map, ColorMapper):
+                color_rgba = color_map(color)
+            else:
+                color_rgba = ColorMapper(color_map, vmin, vmax)(color)
         if color.ndim == 2:
             if color.shape[1] == 3:
                 color_rgba = np.ones([color.shape[0], 4])
@@ -108,17 +138,25 @@ def make_rgba_array(color, length, color_map=None, vmin=None, vmax=None):
     if isinstance(color, list):
         if len(color) != length:
             return -1
+        if all(isinstance(color_string, str) for color_string in color):
+            return strings_to_rgba(color)
         color_rgba = np.ones([len(color), 4])
         for color_index, color_string in enumerate(color):
             if isinstance(color_string, str):
-                color_rgba[color_index, :] = string_to_rgba(color_string)
+                rgba = string_to_rgba(color_string)
+                if rgba == -1:
+                    return -1
+                color_rgba[color_index, :] = rgba
             elif isinstance(color_string, tuple):
                 color_rgba[color_index, :len(color_string)] = color_string
 
     # Transform single color string into color array.
     if isinstance(color, str):
+        rgba = string_to_rgba(color)
+        if rgba == -1:
+            return -1
         color_rgba = np.ones([length, 4])
-        color_rgba[:, :] = np.array(string_to_rgba(color))
+        color_rgba[:, :] = np.array(rgba)
 
     # Transform single color tuple into color array.
     if isinstance(color, tuple):
@@ -129,3 +167,545 @@ def make_rgba_array(color, length, color_map=None, vmin=None, vmax=None):
         color_rgba = np.ones([length, 4])*np.array(color_rgba)
 
     return color_rgba
+
+
+def colormap_lut(color_map=None, size=4096, dtype='float32'):
+    """
+    Return a quantized lookup table of rgba values for a color map.
+    Tables are cached, so repeated calls with the same color map are cheap.
+
+    call signature:
+
+    colormap_lut(color_map=None, size=4096, dtype='float32'):
+
+    Keyword arguments:
+
+    *color_map*:
+      Color map for the values. Name of a built-in color map in COLOR_MAPS,
+      optionally with '_r' for the reversed map, or a color map of matplotlib
+      given by name or object. Only the latter require matplotlib.
+
+    *size*:
+      Number of entries in the table.
+
+    *dtype*:
+      Data type of the table. 'float32' for values in [0, 1] or
+      'uint8' for values in [0, 255].
+    """
+
+    import numpy as np
+
+    if color_map is None:
+        color_map = 'viridis'
+
+    key = (color_map if isinstance(color_map, str) else id(color_map), size,
+           np.dtype(dtype).str)
+    if key in _lut_cache:
+        return _lut_cache[key][1]
+
+    if isinstance(color_map, str) and _base_name(color_map) in COLOR_MAPS:
+        lut = _table_lut(color_map, size)
+    else:
+        if isinstance(color_map, str):
+            try:
+                import matplotlib
+            except ImportError:
+                print("Error: color map '{0}' requires matplotlib.".format(color_map))
+                return -1
+            if not color_map in matplotlib.colormaps:
+                print("Error: unknown color map '{0}'.".format(color_map))
+                return -1
+            color_map = matplotlib.colormaps[color_map]
+        lut = np.asarray(color_map(np.linspace(0, 1, size)), dtype=np.float64)
+    if np.dtype(dtype) == np.uint8:
+        lut = (lut*255 + 0.5).astype(np.uint8)
+    else:
+        lut = lut.astype(dtype)
+
+    # Keep a reference to the color map so that its id stays unique.
+    _lut_cache[key] = (color_map, lut)
+    return lut
+
+
+def _table_lut(name, size):
+    """
+    Interpolate the rgba lookup table of a built-in color map.
+    """
+
+    import numpy as np
+
+    samples = np.frombuffer(bytes.fromhex(''.join(COLOR_MAPS[_base_name(name)])),
+                            dtype=np.uint8).reshape(-1, 3)/255
+    if name.endswith('_r'):
+        samples = samples[::-1]
+    positions = np.linspace(0, 1, samples.shape[0])
+    values = np.linspace(0, 1, size)
+    lut = np.ones([size, 4])
+    for channel in range(3):
+        lut[:, channel] = np.interp(values, positions, samples[:, channel])
+
+    return lut
+
+
+def _base_name(name):
+    """
+    Return the name of a color map without the suffix '_r' of reversed maps.
+    """
+
+    return name[:-2] if name.endswith('_r') else name
+
+
+def map_colors(values, vmin, vmax, color_map=None, out=None, lut_size=4096,
+               chunk_size=2**20):
+    """
+    Map scalar values onto rgba colors in a single lookup table pass.
+
+    call signature:
+
+    map_colors(values, vmin, vmax, color_map=None, out=None, lut_size=4096,
+               chunk_size=2**20):
+
+    Keyword arguments:
+
+    *values*:
+      Array of scalar values of arbitrary shape.
+
+    *vmin, vmax*:
+      Minimum and maximum values for the colormap.
+
+    *color_map*:
+      Color map for the values.
+      These are the same as in matplotlib.
+
+    *out*:
+      Optional float32 or uint8 array of shape [values.size, 4] or
+      values.shape + (4,) into which the colors are written.
+      Can be a transposed view of a pixel buffer.
+
+    *lut_size*:
+      Number of entries in the quantized lookup table.
+
+    *chunk_size*:
+      Number of values processed at once.
+    """
+
+    import numpy as np
+
+    if out is None:
+        out = np.empty([values.size, 4], dtype=np.float32)
+    lut = colormap_lut(color_map, lut_size, out.dtype)
+    if isinstance(lut, int):
+        return -1
+
+    # Process chunks along the first axis of the data.
+    out_view = out.reshape(values.shape + (4,))
+    for chunk_slice in _chunks(values, chunk_size):
+        indices = quantize(values[chunk_slice], vmin, vmax, lut_size)
+        np.take(lut, indices, axis=0, out=out_view[chunk_slice], mode='clip')
+
+    return out
+
+
+class ColorMapper(object):
+    """
+    Color mapper holding the color map, normalization, value range and
+    quantized lookup table. One mapper can be shared by several plots to
+    color them on the same scale.
+    An unspecified vmin or vmax is set once from the data of the first use,
+    i.e. the first call or autoscale, and kept for all later plots.
+    """
+
+    def __init__(self, color_map=None, vmin=None, vmax=None, norm='linear',
+                 linthresh=1, lut_size=4096):
+        """
+        Fill members with the given values.
+
+        call signature:
+
+        ColorMapper(color_map=None, vmin=None, vmax=None, norm='linear',
+                    linthresh=1, lut_size=4096):
+
+        Keyword arguments:
+
+        *color_map*:
+          Color map for the values.
+          These are the same as in matplotlib.
+
+        *vmin, vmax*:
+          Minimum and maximum values for the colormap. If not specified,
+          set from the data of the first use and kept afterwards.
+
+        *norm*:
+          Normalization of the values: 'linear', 'log' or 'symlog'.
+
+        *linthresh*:
+          Range around 0 in which 'symlog' is linear.
+
+        *lut_size*:
+          Number of entries in the quantized lookup table.
+        """
+
+        self.color_map = color_map
+        self.vmin = vmin
+        self.vmax = vmax
+        self.norm = norm
+        self.linthresh = linthresh
+        self.lut_size = lut_size
+
+
+    def autoscale(self, data):
+        """
+        Set the unspecified vmin and vmax from the range of the data.
+        Values which are already set are kept.
+        """
+
+        data_min, data_max = data_range(data)
+        if self.vmin is None:
+            self.vmin = data_min
+        if self.vmax is None:
+            self.vmax = data_max
+
+
+    def lut(self, dtype='float32'):
+        """
+        Return the cached lookup table of the color map.
+        """
+
+        return colormap_lut(self.color_map, self.lut_size, dtype)
+
+
+    def __call__(self, values, out=None, chunk_size=2**20):
+        """
+        Map the values onto rgba colors.
+
+        call signature:
+
+        __call__(values, out=None, chunk_size=2**20):
+
+        Keyword arguments:
+
+        *values*:
+          Array of scalar values of arbitrary shape.
+
+        *out*:
+          Optional float32 or uint8 array of shape [values.size, 4] or
+          values.shape + (4,) into which the colors are written.
+
+        *chunk_size*:
+          Number of values processed at once.
+        """
+
+        import numpy as np
+
+        if not self.norm in ['linear', 'log', 'symlog']:
+            print("Error: norm must be 'linear', 'log' or 'symlog'.")
+            return -1
+        if self.vmin is None or self.vmax is None:
+            self.autoscale(values)
+        vmin, vmax = self.vmin, self.vmax
+        if self.norm == 'log' and vmin <= 0:
+            print("Error: vmin must be positive for norm 'log'.")
+            return -1
+        if self.norm == 'linear':
+            return map_colors(values, vmin, vmax, self.color_map, out, self.lut_size,
+                              chunk_size)
+
+        if out is None:
+            out = np.empty([values.size, 4], dtype=np.float32)
+        lut = self.lut(out.dtype)
+        if isinstance(lut, int):
+            return -1
+        vmin, vmax = self.__transform(np.array([vmin, vmax], dtype=np.float64))
+
+        # Quantize the transformed values chunk by chunk.
+        out_view = out.reshape(values.shape + (4,))
+        for chunk_slice in _chunks(values, chunk_size):
+            indices = quantize(self.__transform(values[chunk_slice]), vmin, vmax,
+                               self.lut_size)
+            np.take(lut, indices, axis=0, out=out_view[chunk_slice], mode='clip')
+
+        return out
+
+
+    def __transform(self, values):
+        """
+        Apply the logarithmic normalization to the values.
+        """
+
+        import numpy as np
+
+        if self.norm == 'log':
+            return np.log10(np.maximum(values, np.finfo(np.float64).tiny))
+
+        # Linear within linthresh and logarithmic outside as matplotlib's SymLogNorm
+        # with base 10 and linscale 1, where one decade spans as much as linthresh.
+        linscale = 1/(1 - 1/10)
+        magnitude = np.abs(values)
+        logarithmic = magnitude > self.linthresh
+        transformed = np.asarray(values*linscale, dtype=np.float64)
+        transformed[logarithmic] = np.sign(values[logarithmic])*self.linthresh * \
+            (linscale + np.log10(magnitude[logarithmic]/self.linthresh))
+        return transformed
+
+
+def quantize(data, vmin, vmax, levels=256, out=None, chunk_size=2**20):
+    """
+    Quantize values between vmin and vmax into integer levels, e.g. palette
+    indices. Values outside [vmin, vmax] are clipped.
+
+    call signature:
+
+    quantize(data, vmin, vmax, levels=256, out=None, chunk_size=2**20):
+
+    Keyword arguments:
+
+    *data*:
+      Array of arbitrary shape. Can be a memory mapped array.
+
+    *vmin, vmax*:
+      Values mapped onto the first and last level.
+
+    *levels*:
+      Number of levels. The result is uint8 for up to 256 levels and
+      uint16 otherwise.
+
+    *out*:
+      Optional integer array of the same shape as data for the result.
+
+    *chunk_size*:
+      Number of values processed at once.
+    """
+
+    import numpy as np
+
+    if out is None:
+        out = np.empty(data.shape, dtype=np.uint8 if levels <= 256 else np.uint16)
+    if vmax > vmin:
+        scale = (levels - 1)/(vmax - vmin)
+    else:
+        scale = 0
+
+    for chunk_slice in _chunks(data, chunk_size):
+        chunk = np.asarray((data[chunk_slice] - vmin)*scale + 0.5)
+        np.clip(chunk, 0, levels - 1, out=chunk)
+        out[chunk_slice] = chunk
+
+    return out
+
+
+def data_range(data, percentiles=None, chunk_size=2**20, bins=4096):
+    """
+    Compute the minimum and maximum of an array chunk by chunk, ignoring NaN.
+    This works on memory mapped arrays without loading them as a whole.
+    Returns vmin, vmax and, if requested, the approximate percentiles.
+
+    call signature:
+
+    data_range(data, percentiles=None, chunk_size=2**20, bins=4096):
+
+    Keyword arguments:
+
+    *data*:
+      Array of arbitrary shape. Can be a memory mapped array.
+
+    *percentiles*:
+      Optional list of percentiles between 0 and 100.
+      They are computed from a histogram of the data, which requires a second
+      pass over the data and is accurate to (vmax - vmin)/bins.
+
+    *chunk_size*:
+      Number of values processed at once.
+
+    *bins*:
+      Number of histogram bins for the percentiles.
+    """
+
+    import numpy as np
+
+    # Ignore NaN values, so the range does not depend on the chunk order.
+    vmin = np.inf
+    vmax = -np.inf
+    for chunk_slice in _chunks(data, chunk_size):
+        chunk = np.asarray(data[chunk_slice])
+        if np.issubdtype(chunk.dtype, np.floating):
+            chunk = chunk[~np.isnan(chunk)]
+        if chunk.size > 0:
+            vmin = min(vmin, np.min(chunk))
+            vmax = max(vmax, np.max(chunk))
+
+    if percentiles is None:
+        return vmin, vmax
+
+    # Accumulate the histogram and invert its cumulative distribution.
+    histogram = np.zeros(bins, dtype=np.int64)
+    for chunk_slice in _chunks(data, chunk_size):
+        histogram += np.histogram(data[chunk_slice], bins=bins, range=(vmin, vmax))[0]
+    cumulative = np.concatenate([[0], np.cumsum(histogram)])/max(histogram.sum(), 1)
+    bin_edges = np.linspace(vmin, vmax, bins+1)
+    values = np.interp(np.asarray(percentiles)/100, cumulative, bin_edges)
+
+    return vmin, vmax, values
+
+
+def normalize(data, vmin=None, vmax=None, out=None, chunk_size=2**20):
+    """
+    Normalize an array to [0, 1] chunk by chunk and write the result into
+    a target buffer. Values outside [vmin, vmax] are clipped.
+
+    call signature:
+
+    normalize(data, vmin=None, vmax=None, out=None, chunk_size=2**20):
+
+    Keyword arguments:
+
+    *data*:
+      Array of arbitrary shape. Can be a memory mapped array.
+
+    *vmin, vmax*:
+      Minimum and maximum values. If not specified, determine from the data.
+
+    *out*:
+      Optional array of the same shape as data into which the normalized
+      values are written. Can be the data itself for an in-place
+      normalization. By default a float32 array is created.
+
+    *chunk_size*:
+      Number of values processed at once.
+    """
+
+    import numpy as np
+
+    if vmin is None or vmax is None:
+        data_min, data_max = data_range(data, chunk_size=chunk_size)
+        if vmin is None:
+            vmin = data_min
+        if vmax is None:
+            vmax = data_max
+    if out is None:
+        out = np.empty(data.shape, dtype=np.float32)
+    if vmax > vmin:
+        scale = 1/(vmax - vmin)
+    else:
+        scale = 0
+
+    for chunk_slice in _chunks(data, chunk_size):
+        chunk = np.asarray((data[chunk_slice] - vmin)*scale)
+        np.clip(chunk, 0, 1, out=chunk)
+        out[chunk_slice] = chunk
+
+    return out
+
+
+def _chunks(data, chunk_size):
+    """
+    Yield slices along the first axis which contain about chunk_size values.
+    A 0-d array is a single chunk and an empty array has none.
+    """
+
+    if data.ndim == 0:
+        yield Ellipsis
+        return
+    if data.shape[0] == 0:
+        return
+    rows = max(chunk_size//max(data[0].size, 1), 1)
+    for start in range(0, data.shape[0], rows):
+        yield slice(start, start+rows)
+
+
+# Cache of the quantized color map lookup tables.
+_lut_cache = {}
+
+# Cache of the converted color strings.
+_rgba_cache = {}
+
+# Hex codes of the named colors. The basic colors and characters are
+# pure rgb colors, the others follow the CSS and matplotlib tableau colors.
+NAMED_COLORS = {
+    'b': '#0000ff', 'g': '#00ff00', 'r': '#ff0000', 'c': '#00ffff', 'm': '#ff00ff',
+    'y': '#ffff00', 'k': '#000000', 'w': '#ffffff', 'blue': '#0000ff', 'green': '#00ff00',
+    'red': '#ff0000', 'cyan': '#00ffff', 'magenta': '#ff00ff', 'yellow': '#ffff00',
+    'black': '#000000', 'white': '#ffffff', 'aliceblue': '#f0f8ff',
+    'antiquewhite': '#faebd7', 'aqua': '#00ffff', 'aquamarine': '#7fffd4',
+    'azure': '#f0ffff', 'beige': '#f5f5dc', 'bisque': '#ffe4c4',
+    'blanchedalmond': '#ffebcd', 'blueviolet': '#8a2be2', 'brown': '#a52a2a',
+    'burlywood': '#deb887', 'cadetblue': '#5f9ea0', 'chartreuse': '#7fff00',
+    'chocolate': '#d2691e', 'coral': '#ff7f50', 'cornflowerblue': '#6495ed',
+    'cornsilk': '#fff8dc', 'crimson': '#dc143c', 'darkblue': '#00008b',
+    'darkcyan': '#008b8b', 'darkgoldenrod': '#b8860b', 'darkgray': '#a9a9a9',
+    'darkgreen': '#006400', 'darkgrey': '#a9a9a9', 'darkkhaki': '#bdb76b',
+    'darkmagenta': '#8b008b', 'darkolivegreen': '#556b2f', 'darkorange': '#ff8c00',
+    'darkorchid': '#9932cc', 'darkred': '#8b0000', 'darksalmon': '#e9967a',
+    'darkseagreen': '#8fbc8f', 'darkslateblue': '#483d8b', 'darkslategray': '#2f4f4f',
+    'darkslategrey': '#2f4f4f', 'darkturquoise': '#00ced1', 'darkviolet': '#9400d3',
+    'deeppink': '#ff1493', 'deepskyblue': '#00bfff', 'dimgray': '#696969',
+    'dimgrey': '#696969', 'dodgerblue': '#1e90ff', 'firebrick': '#b22222',
+    'floralwhite': '#fffaf0', 'forestgreen': '#228b22', 'fuchsia': '#ff00ff',
+    'gainsboro': '#dcdcdc', 'ghostwhite': '#f8f8ff', 'gold': '#ffd700',
+    'goldenrod': '#daa520', 'gray': '#808080', 'greenyellow': '#adff2f', 'grey': '#808080',
+    'honeydew': '#f0fff0', 'hotpink': '#ff69b4', 'indianred': '#cd5c5c',
+    'indigo': '#4b0082', 'ivory': '#fffff0', 'khaki': '#f0e68c', 'lavender': '#e6e6fa',
+    'lavenderblush': '#fff0f5', 'lawngreen': '#7cfc00', 'lemonchiffon': '#fffacd',
+    'lightblue': '#add8e6', 'lightcoral': '#f08080', 'lightcyan': '#e0ffff',
+    'lightgoldenrodyellow': '#fafad2', 'lightgray': '#d3d3d3', 'lightgreen': '#90ee90',
+    'lightgrey': '#d3d3d3', 'lightpink': '#ffb6c1', 'lightsalmon': '#ffa07a',
+    'lightseagreen': '#20b2aa', 'lightskyblue': '#87cefa', 'lightslategray': '#778899',
+    'lightslategrey': '#778899', 'lightsteelblue': '#b0c4de', 'lightyellow': '#ffffe0',
+    'lime': '#00ff00', 'limegreen': '#32cd32', 'linen': '#faf0e6', 'maroon': '#800000',
+    'mediumaquamarine': '#66cdaa', 'mediumblue': '#0000cd', 'mediumorchid': '#ba55d3',
+    'mediumpurple': '#9370db', 'mediumseagreen': '#3cb371', 'mediumslateblue': '#7b68ee',
+    'mediumspringgreen': '#00fa9a', 'mediumturquoise': '#48d1cc',
+    'mediumvioletred': '#c71585', 'midnightblue': '#191970', 'mintcream': '#f5fffa',
+    'mistyrose': '#ffe4e1', 'moccasin': '#ffe4b5', 'navajowhite': '#ffdead',
+    'navy': '#000080', 'oldlace': '#fdf5e6', 'olive': '#808000', 'olivedrab': '#6b8e23',
+    'orange': '#ffa500', 'orangered': '#ff4500', 'orchid': '#da70d6',
+    'palegoldenrod': '#eee8aa', 'palegreen': '#98fb98', 'paleturquoise': '#afeeee',
+    'palevioletred': '#db7093', 'papayawhip': '#ffefd5', 'peachpuff': '#ffdab9',
+    'peru': '#cd853f', 'pink': '#ffc0cb', 'plum': '#dda0dd', 'powderblue': '#b0e0e6',
+    'purple': '#800080', 'rebeccapurple': '#663399', 'rosybrown': '#bc8f8f',
+    'royalblue': '#4169e1', 'saddlebrown': '#8b4513', 'salmon': '#fa8072',
+    'sandybrown': '#f4a460', 'seagreen': '#2e8b57', 'seashell': '#fff5ee',
+    'sienna': '#a0522d', 'silver': '#c0c0c0', 'skyblue': '#87ceeb', 'slateblue': '#6a5acd',
+    'slategray': '#708090', 'slategrey': '#708090', 'snow': '#fffafa',
+    'springgreen': '#00ff7f', 'steelblue': '#4682b4', 'tab:blue': '#1f77b4',
+    'tab:brown': '#8c564b', 'tab:cyan': '#17becf', 'tab:gray': '#7f7f7f',
+    'tab:green': '#2ca02c', 'tab:olive': '#bcbd22', 'tab:orange': '#ff7f0e',
+    'tab:pink': '#e377c2', 'tab:purple': '#9467bd', 'tab:red': '#d62728', 'tan': '#d2b48c',
+    'teal': '#008080', 'thistle': '#d8bfd8', 'tomato': '#ff6347', 'turquoise': '#40e0d0',
+    'violet': '#ee82ee', 'wheat': '#f5deb3', 'whitesmoke': '#f5f5f5',
+    'yellowgreen': '#9acd32'}
+
+# Built-in color maps as 33 equidistant 8 bit rgb samples in hex,
+# linearly interpolated in between. They agree with matplotlib within 2%.
+COLOR_MAPS = {
+    'viridis': (
+        '440154470d6048186a482374472d7b4537814240863e49893b528b375b8d33638d2f6b8e'
+        '2c728e297a8e26828e23898e21918c1f988b1fa08822a78528ae8032b67a3fbc734ec36b'
+        '5ec96270cf5784d44b98d83eaddc30c2df23d8e219ece51bfde725'),
+    'plasma': (
+        '0d08872206903105973f049c4c02a15901a56600a77201a87e03a88a09a59511a1a01a9c'
+        'aa2395b32c8ebc3587c43e7fcc4778d35171da5a6ae06363e66c5ceb7655f0804ef58b47'
+        'f89540fba139fdac33feb82cfdc527fcd225f8df25f4ed27f0f921'),
+    'inferno': (
+        '0000040403120b0724150b37210c4a2f0a5b3d09654a0c6b57106e64156e71196e7d1e6d'
+        '8a226a972766a32c61b0315bbc3754c73e4cd24644db503be45a31eb6628f1731df68013'
+        'f98e09fb9d07fcac11fbbc21f9cb35f5db4cf2ea69f3f68afcffa4'),
+    'magma': (
+        '0000040303120a0822130d341d114729115a36106b440f7651127c5d177f6a1c81762181'
+        '832681902a819c2e7faa337db73779c43c75d0416fdc4869e75263ef5d5ef56b5cf9795d'
+        'fc8961fd9869fea772feb67cfec488fed395fde2a3fcf0b2fcfdbf'),
+    'cividis': (
+        '00224e00285b002e6a0533711a386f273e6e32436d3b496c434e6c4b546c535a6d5a5f6e'
+        '61656f686a716f70737676767d7c788482798c8878938e789b9476a39a74aba072b4a76f'
+        'bcae6cc4b468cdbb63d5c25edec958e7d150f0d846f9e03afee838'),
+    'twilight': (
+        'e2d9e2d7d7ddc4ced4acc2cc95b5c781a6c37297c16887be6276ba5f64b55e51ad5d3da1'
+        '592a8f511b7745135c3811452f14363a113a4a13425f174a741e4f872750983550a64550'
+        'b25652bb6958c27c63c89073cca389d1b6a3d8c7bedfd4d6e2d9e2'),
+    'coolwarm': (
+        '3b4cc0445acc4e68d85875e16282ea6c8ff1779af782a6fb8db0fe98b9ffa3c2feaec9fc'
+        'b9d0f9c3d5f4ccd9edd5dbe5dddcdce5d8d1ecd3c5f1ccb8f5c4acf7ba9ff7b093f6a586'
+        'f4987af08b6eeb7d62e46e56dd5f4bd44e41ca3b37be242eb40426'),
+    'gray': (
+        '000000080808101010181818202020282828303030383838404040484848505050585858'
+        '606060686868707070787878808080888888909090989898a0a0a0a8a8a8b0b0b0b8b8b8'
+        'c0c0c0c8c8c8d0d0d0d8d8d8e0e0e0e8e8e8f0f0f0f8f8f8ffffff')}
@@ -0,0 +1,327 @@
+# geometry.py
+"""
+Contains routines to create geometry arrays in bulk and hand them to the
+active backend.
+
+Created on Mon Mar 09 16:05:00 2020
+
+@author: Simon Candelaresi
+"""
+
+
+def new_mesh(name, vertices, faces, loop_total=None):
+    """
+    Create a mesh object from vertex and face arrays with the active backend.
+    See backends.BlenderBackend.new_mesh for the arguments.
+    """
+
+    from . import backends
+
+    return backends.get_backend().new_mesh(name, vertices, faces, loop_total)
+
+
+def set_attribute(mesh_data, name, values, data_type='FLOAT_COLOR', domain='POINT'):
+    """
+    Write an attribute of a mesh with the active backend.
+    See backends.BlenderBackend.set_attribute for the arguments.
+    """
+
+    from . import backends
+
+    return backends.get_backend().set_attribute(mesh_data, name, values, data_type, domain)
+
+
+def quadtree_faces(x, y, z, tolerance=None, max_faces=None):
+    """
+    Tessellate a structured surface adaptively. Square blocks of cells
+    are merged in a quadtree where the surface deviates from the bilinear
+    interpolation of the block corners by no more than the tolerance,
+    using a conservative bound of the deviation built from the children.
+    Where larger faces meet smaller ones, the larger faces include the
+    vertices on their edges, so the surface has no cracks.
+    Returns the flat indices of the used grid points, the grid point indices
+    of all face loops one after the other, the number of vertices of each
+    face and a dictionary with the number of faces before and after,
+    the reduction ratio, the tolerance, whether the face budget is met
+    and the time taken.
+
+    call signature:
+
+    quadtree_faces(x, y, z, tolerance=None, max_faces=None):
+
+    Keyword arguments:
+
+    *x, y, z*:
+      Coordinates of the grid points of shape [nu, nv].
+
+    *tolerance*:
+      Maximum distance of the grid points from the merged faces.
+
+    *max_faces*:
+      Maximum number of faces. The tolerance is increased until it is met.
+      The blocks have power of two sizes aligned with the grid origin, so cells
+      at the edges of the grid cannot always be merged and the budget can be
+      missed. This is flagged in the returned dictionary.
+    """
+
+    import time
+    import numpy as np
+
+    start = time.time()
+    points = np.stack([x, y, z]).astype(np.float64)
+    nu, nv = x.shape
+
+    # Bound the distance of the points in each block from its bilinear
+    # interpolation level by level. Within a child block it is at most the
+    # error of the child plus the distance of the child corners from the
+    # bilinear interpolation of the parent.
+    errors = [np.zeros([nu-1, nv-1])]
+    size = 2
+    while (nu-1)//size > 0 and (nv-1)//size > 0:
+        children = errors[-1]
+        bu, bv = (nu-1)//size, (nv-1)//size
+        corner_errors = _corner_errors(points[:, :bu*size+1:size//2, :bv*size+1:size//2])
+        error = np.zeros([bu, bv])
+        for ci in range(2):
+            for cj in range(2):
+                child_corners = np.maximum(
+                    np.maximum(corner_errors[ci, cj], corner_errors[ci, cj+1]),
+                    np.maximum(corner_errors[ci+1, cj], corner_errors[ci+1, cj+1]))
+                error = np.maximum(error, children[ci:2*bu:2, cj:2*bv:2] + child_corners)
+        errors.append(error)
+        size *= 2
+
+    # Find the smallest tolerance within the face budget.
+    if tolerance is None:
+        tolerance = 0
+    if not max_faces is None and _quadtree_leaves(errors, tolerance)[1] > max_faces:
+        candidates = np.unique(np.concatenate([error.ravel() for error in errors[1:]]))
+        lower = np.searchsorted(candidates, tolerance)
+        upper = candidates.size - 1
+        while lower < upper:
+            middle = (lower + upper)//2
+            if _quadtree_leaves(errors, candidates[middle])[1] > max_faces:
+                lower = middle + 1
+            else:
+                upper = middle
+        tolerance = candidates[upper]
+    leaves, n_faces = _quadtree_leaves(errors, tolerance)
+
+    # Mark the corners of all leaves as used grid points.
+    used = np.zeros([nu, nv], dtype=bool)
+    for level, leaf in enumerate(leaves):
+        size = 2**level
+        leaf_i, leaf_j = np.nonzero(leaf)
+        for di, dj in [(0, 0), (0, 1), (1, 1), (1, 0)]:
+            used[(leaf_i + di)*size, (leaf_j + dj)*size] = True
+    used = used.ravel()
+
+    # Walk the boundary of each leaf and keep the used grid points.
+    loops = []
+    loop_total = []
+    for level, leaf in enumerate(leaves):
+        size = 2**level
+        leaf_i, leaf_j = np.nonzero(leaf)
+        steps = np.arange(size)
+        di = np.concatenate([np.zeros(size, dtype=int), steps, np.full(size, size), size - steps])
+        dj = np.concatenate([steps, np.full(size, size), size - steps, np.zeros(size, dtype=int)])
+        boundary = ((leaf_i[:, np.newaxis]*size + di)*nv + leaf_j[:, np.newaxis]*size + dj)
+        inside = used[boundary]
+        loops.append(boundary[inside])
+        loop_total.append(inside.sum(axis=1))
+
+    budget_met = bool(max_faces is None or n_faces <= max_faces)
+    if not budget_met:
+        print("Warning: the face budget of {0} cannot be met, the surface has {1} faces."
+              .format(max_faces, n_faces))
+
+    info = {'faces': (nu-1)*(nv-1), 'adaptive_faces': n_faces,
+            'ratio': n_faces/max((nu-1)*(nv-1), 1), 'tolerance': tolerance,
+            'budget_met': budget_met, 'time': time.time() - start}
+
+    return np.flatnonzero(used), np.concatenate(loops), np.concatenate(loop_total), info
+
+
+def _corner_errors(samples):
+    """
+    Compute the distances of the corners of the child blocks from the
+    bilinear interpolation of their parent block. The samples of shape
+    [3, 2*bu+1, 2*bv+1] contain the corners, edge midpoints and centers
+    of the parent blocks. Returns an array of shape [3, 3, bu, bv].
+    """
+
+    import numpy as np
+
+    c00 = samples[:, 0:-1:2, 0:-1:2]
+    c01 = samples[:, 0:-1:2, 2::2]
+    c10 = samples[:, 2::2, 0:-1:2]
+    c11 = samples[:, 2::2, 2::2]
+    errors = np.zeros((3, 3) + c00.shape[1:])
+    errors[0, 1] = np.linalg.norm(samples[:, 0:-1:2, 1::2] - (c00 + c01)/2, axis=0)
+    errors[2, 1] = np.linalg.norm(samples[:, 2::2, 1::2] - (c10 + c11)/2, axis=0)
+    errors[1, 0] = np.linalg.norm(samples[:, 1::2, 0:-1:2] - (c00 + c10)/2, axis=0)
+    errors[1, 2] = np.linalg.norm(samples[:, 1::2, 2::2] - (c01 + c11)/2, axis=0)
+    errors[1, 1] = np.linalg.norm(samples[:, 1::2, 1::2] - (c00 + c01 + c10 + c11)/4, axis=0)
+
+    return errors
+
+
+def _quadtree_leaves(errors, tolerance):
+    """
+    Find the leaves of the quadtree for a tolerance. Returns a boolean array
+    of the leaf blocks of each level and the number of leaves.
+    """
+
+    import numpy as np
+
+    leaves = [None]*len(errors)
+    covered = np.zeros([0, 0], dtype=bool)
+    for level in range(len(errors)-1, -1, -1):
+        merged = errors[level] <= tolerance
+        # Blocks inside a merged parent are no leaves.
+        parent = np.zeros_like(merged)
+        expanded = np.repeat(np.repeat(covered, 2, axis=0), 2, axis=1)
+        parent[:expanded.shape[0], :expanded.shape[1]] = expanded
+        leaves[level] = merged & ~parent
+        covered = merged | parent
+
+    return leaves, sum(leaf.sum() for leaf in leaves)
+
+
+def instance_on_points(name, points, template_object, attributes=None,
+                       rotation_attribute=None, scale_attribute=None):
+    """
+    Show an instance of the template object on every point with the active
+    backend. See backends.BlenderBackend.instance_on_points for the arguments.
+    """
+
+    from . import backends
+
+    return backends.get_backend().instance_on_points(name, points, template_object, attributes,
+                                                     rotation_attribute, scale_attribute)
+
+
+def tube_mesh(points, offsets, radius, resolution=8):
+    """
+    Sweep circles along poly lines and return the vertices and quad faces
+    of all tubes. The circles are oriented with rotation minimizing frames.
+
+    call signature:
+
+    tube_mesh(points, offsets, radius, resolution=8):
+
+    Keyword arguments:
+
+    *points*:
+      Array of shape [n_points, 3] with the points of all lines one after the other.
+
+    *offsets*:
+      Integer array with the index of the first point of each line and
+      the total number of points at the end.
+
+    *radius*:
+      Radius of the tubes. Real number or array with one value per point.
+
+    *resolution*:
+      Number of vertices around the circumference of the tubes.
+    """
+
+    import numpy as np
+
+    points = np.asarray(points, dtype=np.float64).reshape(-1, 3)
+    offsets = np.asarray(offsets, dtype=np.int64)
+    starts = offsets[:-1]
+    lengths = np.diff(offsets)
+    line_index = np.repeat(np.arange(lengths.size), lengths)
+    position = np.arange(points.shape[0]) - starts[line_index]
+
+    # Tangents from the neighboring points within each line.
+    previous = np.where(position > 0, np.arange(points.shape[0]) - 1, np.arange(points.shape[0]))
+    following = np.where(position < lengths[line_index] - 1, np.arange(points.shape[0]) + 1,
+                         np.arange(points.shape[0]))
+    tangents = points[following] - points[previous]
+    tangents /= np.maximum(np.linalg.norm(tangents, axis=1), 1e-30)[:, np.newaxis]
+
+    # Start each line with a normal perpendicular to its first tangent.
+    # Lines of a single point have no tangent and get an arbitrary one.
+    first = tangents[starts[lengths > 0]]
+    first[np.linalg.norm(first, axis=1) < 0.5] = [0, 0, 1]
+    axis = np.eye(3)[np.argmin(np.abs(first), axis=1)]
+    first_normals = np.cross(first, axis)
+    first_normals /= np.linalg.norm(first_normals, axis=1)[:, np.newaxis]
+
+    # Minimal rotations between consecutive tangents, identity at the line starts.
+    rotations = np.zeros([points.shape[0], 4])
+    rotations[:, 0] = 1
+    inner = np.flatnonzero(position > 0)
+    rotations[inner, 0] = 1 + np.sum(tangents[inner-1]*tangents[inner], axis=1)
+    rotations[inner, 1:] = np.cross(tangents[inner-1], tangents[inner])
+    # Turn by half a revolution where the line turns back on itself.
+    reverse = inner[rotations[inner, 0] < 1e-12]
+    rotations[reverse, 0] = 0
+    rotations[reverse, 1:] = np.cross(tangents[reverse],
+                                      np.eye(3)[np.argmin(np.abs(tangents[reverse]), axis=1)])
+    rotations /= np.linalg.norm(rotations, axis=1)[:, np.newaxis]
+
+    # Accumulate the rotations along each line with a parallel prefix product
+    # and rotate the first normal of the line with them.
+    shift = 1
+    while shift < (lengths.max() if lengths.size > 0 else 0):
+        product = _quaternion_product(rotations[shift:], rotations[:-shift])
+        combine = (position[shift:] >= shift)[:, np.newaxis]
+        rotations[shift:] = np.where(combine, product, rotations[shift:])
+        shift *= 2
+    rotations /= np.linalg.norm(rotations, axis=1)[:, np.newaxis]
+    normals = _rotate(rotations, np.repeat(first_normals, lengths[lengths > 0], axis=0))
+
+    # Remove the rounding errors which leave the plane of the tangent.
+    normals -= np.sum(normals*tangents, axis=1)[:, np.newaxis]*tangents
+    normals /= np.maximum(np.linalg.norm(normals, axis=1), 1e-30)[:, np.newaxis]
+    binormals = np.cross(tangents, normals)
+
+    # Rings of vertices around the points.
+    angle = 2*np.pi*np.arange(resolution)/resolution
+    radius = np.broadcast_to(np.asarray(radius, dtype=np.float64), (points.shape[0],))
+    vertices = (points[:, np.newaxis, :] + radius[:, np.newaxis, np.newaxis] *
+                (np.cos(angle)[:, np.newaxis]*normals[:, np.newaxis, :] +
+                 np.sin(angle)[:, np.newaxis]*binormals[:, np.newaxis, :]))
+
+    # Quads between consecutive rings of the same line.
+    segments = np.flatnonzero(position < lengths[line_index] - 1)
+    ring = np.arange(resolution)
+    ring_next = (ring + 1) % resolution
+    lower = segments[:, np.newaxis]*resolution
+    upper = lower + resolution
+    faces = np.stack([lower + ring, lower + ring_next, upper + ring_next, upper + ring], axis=-1)
+
+    return vertices.reshape(-1, 3), faces.reshape(-1, 4)
+
+
+def _quaternion_product(a, b):
+    """
+    Multiply the quaternions of shape [n, 4] with the real part first.
+    """
+
+    import numpy as np
+
+    a0, a1, a2, a3 = a.T
+    b0, b1, b2, b3 = b.T
+    product = np.empty([a.shape[0], 4])
+    product[:, 0] = a0*b0 - a1*b1 - a2*b2 - a3*b3
+    product[:, 1] = a0*b1 + a1*b0 + a2*b3 - a3*b2
+    product[:, 2] = a0*b2 - a1*b3 + a2*b0 + a3*b1
+    product[:, 3] = a0*b3 + a1*b2 - a2*b1 + a3*b0
+
+    return product
+
+
+def _rotate(quaternions, vectors):
+    """
+    Rotate the vectors of shape [n, 3] by the unit quaternions of shape [n, 4].
+    """
+
+    import numpy as np
+
+    twice_cross = 2*np.cross(quaternions[:, 1:], vectors)
+
+    return vectors + quaternions[:, :1]*twice_cross + np.cross(quaternions[:, 1:], twice_cross)
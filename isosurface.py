@@ -0,0 +1,886 @@
+# isosurface.py
+"""
+Contains routines to extract isosurfaces from scalar fields.
+
+Created on Mon Mar 09 14:12:00 2020
+
+@author: Simon Candelaresi
+"""
+
+
+'''
+Test:
+import numpy as np
+import importlib
+import blendaviz as blt
+importlib.reload(blt.isosurface)
+x = np.linspace(-2, 2, 64)
+y = np.linspace(-2, 2, 64)
+z = np.linspace(-2, 2, 64)
+xx, yy, zz = np.meshgrid(x, y, z, indexing='ij')
+phi = xx**2 + yy**2 + zz**2
+vertices, faces = blt.isosurface.marching_cubes(phi, 1, x, y, z)
+
+# Scaling of the parallel extraction across core counts.
+timings = blt.isosurface.benchmark_parallel(n=256, worker_counts=[1, 2, 4, 8])
+for n_workers, duration in timings['parallel'].items():
+    print(n_workers, duration, timings['serial']/duration)
+'''
+
+# Offsets of the cube corners.
+CORNERS = ((0, 0, 0), (1, 0, 0), (1, 1, 0), (0, 1, 0),
+           (0, 0, 1), (1, 0, 1), (1, 1, 1), (0, 1, 1))
+
+# Cube edges as pairs of corners.
+EDGES = ((0, 1), (1, 2), (2, 3), (3, 0), (4, 5), (5, 6),
+         (6, 7), (7, 4), (0, 4), (1, 5), (2, 6), (3, 7))
+
+# Cube faces as cycles of corners.
+FACES = ((0, 1, 2, 3), (4, 5, 6, 7), (0, 1, 5, 4),
+         (1, 2, 6, 5), (2, 3, 7, 6), (3, 0, 4, 7))
+
+
+def marching_cubes(phi, level, x=None, y=None, z=None):
+    """
+    Extract the isosurface phi = level as a welded triangle mesh.
+    The normals of the triangles point towards decreasing phi.
+    Returns the vertices of shape [n_vertices, 3] and the faces of shape
+    [n_faces, 3].
+
+    call signature:
+
+    marching_cubes(phi, level, x=None, y=None, z=None):
+
+    Keyword arguments:
+
+    *phi*:
+      Scalar field of shape [nx, ny, nz].
+
+    *level*:
+      Value of phi on the isosurface.
+
+    *x, y, z*:
+      1d arrays of the coordinates or arrays of the same shape as phi.
+      If not specified, use the grid indices.
+    """
+
+    return marching_cubes_levels(phi, [level], x, y, z)[0]
+
+
+def marching_cubes_levels(phi, levels, x=None, y=None, z=None, slab_size=16, index=None):
+    """
+    Extract the isosurfaces for several levels in a single sweep over the grid.
+    Every cell is only triangulated for the levels within its range of phi.
+    Returns a list with the vertices and faces for each level.
+
+    call signature:
+
+    marching_cubes_levels(phi, levels, x=None, y=None, z=None, slab_size=16, index=None):
+
+    Keyword arguments:
+
+    *phi*:
+      Scalar field of shape [nx, ny, nz].
+
+    *levels*:
+      List or array of values of phi on the isosurfaces.
+
+    *x, y, z*:
+      1d arrays of the coordinates or arrays of the same shape as phi.
+      If not specified, use the grid indices.
+
+    *slab_size*:
+      Number of cell layers in x processed at once.
+
+    *index*:
+      Optional MinMaxIndex of phi. Only the cells of the blocks which
+      contain any of the levels are visited.
+    """
+
+    import numpy as np
+
+    levels = np.asarray(levels, dtype=np.float64).ravel()
+    order = np.argsort(levels)
+    sorted_levels = levels[order]
+
+    # Find all pairs of cells and levels they straddle.
+    if index is None:
+        cells, level_index = _active_cells(phi, sorted_levels, slab_size)
+    else:
+        cells, level_index = index.active_cells(sorted_levels)
+    sort = np.argsort(level_index, kind='stable')
+    cells = cells[sort]
+    bounds = np.searchsorted(level_index[sort], np.arange(levels.size+1))
+
+    # Triangulate the cells of each level.
+    phi_flat = phi.reshape(-1)
+    meshes = [None]*levels.size
+    for index, level in enumerate(sorted_levels):
+        level_cells = cells[bounds[index]:bounds[index+1]]
+        cases = _cases(phi_flat, phi.shape, level_cells, level)
+        meshes[order[index]] = _triangulate(phi, level, level_cells, cases, x, y, z)
+
+    return meshes
+
+
+def marching_cubes_parallel(phi, levels, x=None, y=None, z=None, n_workers=None,
+                            slab_size=16):
+    """
+    Extract the isosurfaces for several levels with a pool of processes.
+    phi is split into slabs in x, which share one plane of points, and each
+    slab is triangulated, welded and interpolated by a worker reading phi
+    from shared memory. The parent only merges the duplicate vertices on the
+    seam planes by their edge ids, so the meshes are identical to those of
+    marching_cubes_levels.
+    Returns a list with the vertices and faces for each level.
+
+    call signature:
+
+    marching_cubes_parallel(phi, levels, x=None, y=None, z=None, n_workers=None,
+                            slab_size=16):
+
+    Keyword arguments:
+
+    *phi*:
+      Scalar field of shape [nx, ny, nz].
+
+    *levels*:
+      List or array of values of phi on the isosurfaces.
+
+    *x, y, z*:
+      1d arrays of the coordinates or arrays of the same shape as phi.
+      If not specified, use the grid indices.
+
+    *n_workers*:
+      Number of processes. If not specified, use the number of cores.
+
+    *slab_size*:
+      Number of cell layers in x processed at once by each worker.
+    """
+
+    import os
+    import numpy as np
+    from concurrent.futures import ProcessPoolExecutor
+
+    phi = np.asarray(phi)
+    levels = np.asarray(levels, dtype=np.float64).ravel()
+    order = np.argsort(levels)
+    sorted_levels = levels[order]
+    if n_workers is None:
+        n_workers = os.cpu_count()
+    i_bounds = np.linspace(0, phi.shape[0]-1, min(n_workers, phi.shape[0]-1)+1).astype(int)
+
+    # Copy phi and the coordinate arrays of its shape into shared memory once
+    # for all workers. Their data types are kept, so the vertices are
+    # interpolated exactly as in the serial path.
+    memories = []
+    shared = []
+    try:
+        phi_spec = _share(phi, memories, shared)
+        coordinate_specs = [_share(coordinate, memories, shared)
+                            if isinstance(coordinate, np.ndarray) and coordinate.ndim > 1
+                            else coordinate for coordinate in [x, y, z]]
+        # The workers receive the tables instead of generating them again.
+        with ProcessPoolExecutor(len(i_bounds)-1, initializer=_set_tables,
+                                 initargs=(list(_tables()),)) as executor:
+            futures = [executor.submit(_slab_worker, phi_spec, coordinate_specs, sorted_levels,
+                                       i_bounds[slab], i_bounds[slab+1], slab_size)
+                       for slab in range(len(i_bounds)-1)]
+            slabs = [future.result() for future in futures]
+    finally:
+        del shared
+        for memory in memories:
+            memory.close()
+            memory.unlink()
+
+    # Merge the welded slabs.
+    meshes = [None]*levels.size
+    for index in range(levels.size):
+        meshes[order[index]] = _merge_slabs([slab[index] for slab in slabs])
+
+    return meshes
+
+
+def benchmark_parallel(n=128, levels=(-0.5, 0, 0.5), worker_counts=(1, 2, 4, 8), repeats=3):
+    """
+    Time the serial and the parallel extraction on a grid of n^3 points for
+    several numbers of workers and check that their meshes are identical.
+    Returns a dictionary with the best time of the serial path, the best
+    times of the parallel path for each number of workers and the number
+    of cores.
+
+    call signature:
+
+    benchmark_parallel(n=128, levels=(-0.5, 0, 0.5), worker_counts=(1, 2, 4, 8), repeats=3):
+
+    Keyword arguments:
+
+    *n*:
+      Number of grid points in each direction.
+
+    *levels*:
+      Values of phi on the isosurfaces.
+
+    *worker_counts*:
+      Numbers of processes to time.
+
+    *repeats*:
+      Number of runs of which the fastest is kept.
+    """
+
+    import os
+    import time
+    import numpy as np
+
+    x = np.linspace(-2, 2, n)
+    xx, yy, zz = np.meshgrid(x, x, x, indexing='ij')
+    phi = np.sin(3*xx)*np.cos(4*yy)*np.sin(5*zz)
+    del(xx, yy, zz)
+    _tables()
+
+    def best_time(function, *args, **kwargs):
+        durations = []
+        for repeat in range(repeats):
+            start = time.time()
+            result = function(*args, **kwargs)
+            durations.append(time.time() - start)
+        return min(durations), result
+
+    timings = {'serial': None, 'parallel': {}, 'identical': {}, 'cores': os.cpu_count()}
+    timings['serial'], serial_meshes = best_time(marching_cubes_levels, phi, levels, x, x, x)
+    for n_workers in worker_counts:
+        timings['parallel'][n_workers], meshes = best_time(marching_cubes_parallel, phi,
+                                                           levels, x, x, x, n_workers)
+        timings['identical'][n_workers] = all(
+            np.array_equal(serial[0], parallel[0]) and np.array_equal(serial[1], parallel[1])
+            for serial, parallel in zip(serial_meshes, meshes))
+
+    return timings
+
+
+def _share(array, memories, shared):
+    """
+    Copy an array into a new block of shared memory.
+    Returns the name, shape and data type with which workers attach to it.
+    """
+
+    import numpy as np
+    from multiprocessing import shared_memory
+
+    memory = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+    memories.append(memory)
+    shared_array = np.ndarray(array.shape, dtype=array.dtype, buffer=memory.buf)
+    shared_array[...] = array
+    shared.append(shared_array)
+
+    return memory.name, array.shape, array.dtype.str
+
+
+def _slab_worker(phi_spec, coordinate_specs, levels, i0, i1, slab_size):
+    """
+    Triangulate, weld and interpolate the cells between the x-indices i0 and
+    i1 of the shared phi. Returns for each level the vertices and faces of the
+    slab, the number of vertices on edges along each axis and the indices
+    and edge ids of the vertices on the lower and upper seam planes.
+    """
+
+    import numpy as np
+    from multiprocessing import shared_memory
+
+    memories = []
+    shared = []
+    phi = x = y = z = None
+    try:
+        # Attach to phi and to the shared coordinate arrays.
+        for spec in [phi_spec] + coordinate_specs:
+            if isinstance(spec, tuple):
+                memories.append(shared_memory.SharedMemory(name=spec[0]))
+                shared.append(np.ndarray(spec[1], dtype=spec[2], buffer=memories[-1].buf))
+            else:
+                shared.append(spec)
+        phi, x, y, z = shared
+        nx, ny, nz = phi.shape
+
+        # Find the active cells of the slab. Cells are numbered along x
+        # first, so their global indices follow from an offset.
+        cells, level_index = _active_cells(phi[i0:i1+1], levels, slab_size)
+        cells += i0*(ny-1)*(nz-1)
+        sort = np.argsort(level_index, kind='stable')
+        cells = cells[sort]
+        bounds = np.searchsorted(level_index[sort], np.arange(levels.size+1))
+
+        slab_meshes = []
+        for index, level in enumerate(levels):
+            level_cells = cells[bounds[index]:bounds[index+1]]
+            cases = _cases(phi.reshape(-1), phi.shape, level_cells, level)
+            edge_ids = _triangle_edges(phi.shape, level_cells, cases)[1]
+            edge_ids, faces = np.unique(edge_ids, return_inverse=True)
+            vertices = _interpolate(phi, level, edge_ids, x, y, z)
+
+            # Only the seam vertices need their edge ids for the merge.
+            axis_counts = np.diff(np.searchsorted(edge_ids, np.arange(4)*phi.size))
+            plane = (edge_ids % phi.size)//(ny*nz)
+            seams = [np.flatnonzero(plane == i) for i in [i0, i1]]
+            slab_meshes.append((vertices, faces.reshape(-1, 3).astype(np.int32), axis_counts,
+                                [(seam, edge_ids[seam]) for seam in seams]))
+    finally:
+        del phi, x, y, z, shared
+        for memory in memories:
+            memory.close()
+
+    return slab_meshes
+
+
+def _merge_slabs(slab_meshes):
+    """
+    Merge the welded meshes of the slabs into one mesh. The vertices on the
+    seam planes appear in both neighboring slabs and are kept once.
+    The vertices are ordered by their edge ids and the faces by their
+    cells, as in the serial path.
+    """
+
+    import numpy as np
+
+    n_slabs = len(slab_meshes)
+
+    # Find the vertices on the lower seam plane of each slab on the upper
+    # seam plane of the previous slab.
+    duplicate = []
+    for slab, (vertices, faces, axis_counts, seams) in enumerate(slab_meshes):
+        lower_index, lower_ids = seams[0]
+        if slab == 0 or lower_ids.size == 0:
+            duplicate.append((lower_index[:0], lower_index[:0]))
+            continue
+        upper_index, upper_ids = slab_meshes[slab-1][3][1]
+        position = np.minimum(np.searchsorted(upper_ids, lower_ids), max(upper_ids.size-1, 0))
+        found = upper_ids[position] == lower_ids if upper_ids.size > 0 \
+            else np.zeros(lower_ids.size, dtype=bool)
+        duplicate.append((lower_index[found], upper_index[position[found]]))
+
+    # Count the kept vertices of each slab for each edge axis. The global
+    # order sorts by axis first and by slab second, i.e. by edge id.
+    axes = [np.repeat(np.arange(3), slab_mesh[2]) for slab_mesh in slab_meshes]
+    keep = []
+    for axis, (lower_index, upper_index) in zip(axes, duplicate):
+        keep.append(np.ones(axis.size, dtype=bool))
+        keep[-1][lower_index] = False
+    counts = np.array([np.bincount(axis[slab_keep], minlength=3)
+                       for axis, slab_keep in zip(axes, keep)]).reshape(n_slabs, 3)
+    starts = (np.cumsum(counts.T.ravel()) - counts.T.ravel()).reshape(3, n_slabs)
+
+    # Number the vertices and renumber the faces.
+    vertices = np.empty([counts.sum(), 3])
+    faces = []
+    for slab, (slab_vertices, slab_faces, axis_counts, seams) in enumerate(slab_meshes):
+        axis = axes[slab]
+        rank = np.cumsum(keep[slab]) - 1 - np.concatenate([[0], np.cumsum(counts[slab])])[axis]
+        index = starts[axis, slab] + rank
+        if slab > 0:
+            index[duplicate[slab][0]] = previous_index[duplicate[slab][1]]
+        vertices[index[keep[slab]]] = slab_vertices[keep[slab]]
+        faces.append(index[slab_faces])
+        previous_index = index
+    faces = np.concatenate(faces) if faces else np.zeros([0, 3], dtype=np.int64)
+
+    return vertices, faces
+
+
+def _active_cells(phi, levels, slab_size):
+    """
+    Find the cells which contain the isosurface of any of the sorted levels.
+    Returns the flat cell indices and the index of the level for each pair.
+    """
+
+    import numpy as np
+
+    nx, ny, nz = phi.shape
+    cells = []
+    level_index = []
+    for i0 in range(0, nx-1, slab_size):
+        i1 = min(i0 + slab_size, nx-1)
+        block = phi[i0:i1+1]
+
+        # A cell contains the isosurface if cell_min <= level < cell_max.
+        corners = [block[ox:i1-i0+ox, oy:ny-1+oy, oz:nz-1+oz] for ox, oy, oz in CORNERS]
+        cell_min = corners[0]
+        cell_max = corners[0]
+        for corner in corners[1:]:
+            cell_min = np.minimum(cell_min, corner)
+            cell_max = np.maximum(cell_max, corner)
+        slab_cells, slab_level_index = _straddled_levels(
+            np.arange(cell_min.size) + i0*(ny-1)*(nz-1), cell_min.ravel(),
+            cell_max.ravel(), levels)
+        cells.append(slab_cells)
+        level_index.append(slab_level_index)
+
+    return np.concatenate(cells), np.concatenate(level_index)
+
+
+def _straddled_levels(cells, cell_min, cell_max, levels):
+    """
+    Expand the cells into one entry for each of the sorted levels with
+    cell_min <= level < cell_max. Returns the cells and the level indices.
+    """
+
+    import numpy as np
+
+    lower = np.searchsorted(levels, cell_min, 'left')
+    counts = np.searchsorted(levels, cell_max, 'left') - lower
+    active = np.flatnonzero(counts)
+    counts = counts[active]
+    ranks = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+
+    return np.repeat(cells[active], counts), np.repeat(lower[active], counts) + ranks
+
+
+class MinMaxIndex(object):
+    """
+    Index of the minimum and maximum of phi in blocks of cells.
+    It is built once and answers which cells contain an isosurface by only
+    visiting the blocks whose range contains the level.
+    """
+
+    def __init__(self, phi, block_size=8):
+        """
+        Compute the minimum and maximum of phi for each block of cells.
+
+        call signature:
+
+        MinMaxIndex(phi, block_size=8):
+
+        Keyword arguments:
+
+        *phi*:
+          Scalar field of shape [nx, ny, nz].
+
+        *block_size*:
+          Number of cells of the blocks in each direction.
+        """
+
+        import numpy as np
+
+        self.phi = phi
+        self.block_size = block_size
+
+        # Reduce one slab of blocks in x at a time. Blocks of cells share
+        # their boundary points with the next block.
+        x_starts = np.arange(0, phi.shape[0]-1, block_size)
+        self.block_min = []
+        self.block_max = []
+        for i0 in x_starts:
+            slab = phi[i0:i0+block_size+1]
+            self.block_min.append(self.__reduce_plane(slab.min(axis=0), np.minimum))
+            self.block_max.append(self.__reduce_plane(slab.max(axis=0), np.maximum))
+        self.block_min = np.array(self.block_min)
+        self.block_max = np.array(self.block_max)
+
+
+    def __reduce_plane(self, plane, ufunc):
+        """
+        Reduce a plane of shape [ny, nz] onto the blocks in y and z.
+        """
+
+        import numpy as np
+
+        for axis in range(2):
+            n = plane.shape[axis]
+            starts = np.arange(0, n-1, self.block_size)
+            closing = np.minimum(starts + self.block_size, n-1)
+            plane = ufunc(ufunc.reduceat(plane, starts, axis=axis),
+                          np.take(plane, closing, axis=axis))
+
+        return plane
+
+
+    def active_cells(self, levels, dense_fraction=0.2):
+        """
+        Find the cells which contain the isosurface of any of the sorted levels.
+        Returns the flat cell indices in ascending order and the index of the
+        level for each pair.
+
+        call signature:
+
+        active_cells(levels, dense_fraction=0.2):
+
+        Keyword arguments:
+
+        *levels*:
+          Sorted array of levels.
+
+        *dense_fraction*:
+          Fraction of active blocks above which all cells are swept slab by
+          slab, which is faster than gathering the cells of the blocks.
+        """
+
+        import numpy as np
+
+        nx, ny, nz = self.phi.shape
+        cell_shape = (nx-1, ny-1, nz-1)
+
+        # Find the blocks that contain any of the levels.
+        lower = np.searchsorted(levels, self.block_min.ravel(), 'left')
+        upper = np.searchsorted(levels, self.block_max.ravel(), 'left')
+        blocks = np.flatnonzero(upper > lower)
+        if blocks.size > dense_fraction*self.block_min.size:
+            return _active_cells(self.phi, levels, 16)
+
+        # Collect the cells of these blocks.
+        local = np.indices([self.block_size]*3).reshape(3, -1)
+        block_index = np.unravel_index(blocks, self.block_min.shape)
+        cell_index = [block_index[axis][:, np.newaxis]*self.block_size + local[axis]
+                      for axis in range(3)]
+        inside = ((cell_index[0] < cell_shape[0]) & (cell_index[1] < cell_shape[1])
+                  & (cell_index[2] < cell_shape[2]))
+        cells = np.sort(np.ravel_multi_index([index[inside] for index in cell_index],
+                                             cell_shape))
+
+        # Compute the range of phi within these cells.
+        phi_flat = self.phi.reshape(-1)
+        cell_i, cell_j, cell_k = np.unravel_index(cells, cell_shape)
+        origin = (cell_i*ny + cell_j)*nz + cell_k
+        cell_min = phi_flat[origin]
+        cell_max = cell_min
+        for ox, oy, oz in CORNERS[1:]:
+            corner = phi_flat[origin + (ox*ny + oy)*nz + oz]
+            cell_min = np.minimum(cell_min, corner)
+            cell_max = np.maximum(cell_max, corner)
+
+        return _straddled_levels(cells, cell_min, cell_max, levels)
+
+
+def _cases(phi_flat, shape, cells, level):
+    """
+    Compute the marching cubes case of the given cells, i.e. the bit mask of
+    the cell corners with phi > level.
+    """
+
+    import numpy as np
+
+    nx, ny, nz = shape
+    cell_i, cell_j, cell_k = np.unravel_index(cells, (nx-1, ny-1, nz-1))
+    origin = (cell_i*ny + cell_j)*nz + cell_k
+    cases = np.zeros(cells.size, dtype=np.uint8)
+    for bit, (ox, oy, oz) in enumerate(CORNERS):
+        inside = phi_flat[origin + (ox*ny + oy)*nz + oz] > level
+        cases |= inside.astype(np.uint8) << bit
+
+    return cases
+
+
+def _triangulate(phi, level, cells, cases, x=None, y=None, z=None):
+    """
+    Triangulate the given cells with their marching cubes cases.
+    Vertices on shared edges are computed only once.
+
+    call signature:
+
+    _triangulate(phi, level, cells, cases, x=None, y=None, z=None):
+
+    Keyword arguments:
+
+    *phi*:
+      Scalar field of shape [nx, ny, nz].
+
+    *level*:
+      Value of phi on the isosurface.
+
+    *cells*:
+      Flat indices of the cells in the [nx-1, ny-1, nz-1] cell grid.
+
+    *cases*:
+      Marching cubes cases of the cells.
+
+    *x, y, z*:
+      Coordinates as for marching_cubes.
+    """
+
+    edge_ids = _triangle_edges(phi.shape, cells, cases)[1]
+
+    return _weld(phi, level, edge_ids, x, y, z)
+
+
+def _triangle_edges(shape, cells, cases):
+    """
+    Expand the cells into their triangles. Returns the cell of each triangle
+    and the global ids of the edges with the triangle vertices.
+    """
+
+    import numpy as np
+
+    n_triangles, triangle_table = _tables()
+    nx, ny, nz = shape
+    n_points = nx*ny*nz
+    strides = np.array([ny*nz, nz, 1])
+
+    # Expand the cells into their triangles.
+    counts = n_triangles[cases]
+    cell_triangles = np.repeat(cells, counts)
+    slots = np.arange(cell_triangles.size) - np.repeat(np.cumsum(counts) - counts, counts)
+    triangle_edges = triangle_table[np.repeat(cases, counts), slots]
+
+    # Identify every edge by its axis and its lower grid point.
+    cell_i, cell_j, cell_k = np.unravel_index(cell_triangles, (nx-1, ny-1, nz-1))
+    origin = (cell_i*ny + cell_j)*nz + cell_k
+    edge_axis = np.array([np.argmax(np.abs(np.subtract(CORNERS[b], CORNERS[a])))
+                          for a, b in EDGES])
+    edge_offset = np.array([np.dot(np.minimum(CORNERS[a], CORNERS[b]), strides)
+                            for a, b in EDGES])
+    edge_ids = (edge_axis[triangle_edges]*n_points + origin[:, np.newaxis]
+                + edge_offset[triangle_edges])
+
+    return cell_triangles, edge_ids
+
+
+def _weld(phi, level, edge_ids, x=None, y=None, z=None):
+    """
+    Weld the triangle vertices on shared edges and interpolate their positions.
+    """
+
+    import numpy as np
+
+    # Weld the vertices on shared edges.
+    edge_ids, faces = np.unique(edge_ids, return_inverse=True)
+
+    return _interpolate(phi, level, edge_ids, x, y, z), faces.reshape(-1, 3)
+
+
+def _interpolate(phi, level, edge_ids, x=None, y=None, z=None):
+    """
+    Interpolate the positions of the vertices on the given edges.
+    """
+
+    import numpy as np
+
+    ny, nz = phi.shape[1:]
+    n_points = phi.size
+    strides = np.array([ny*nz, nz, 1])
+
+    # Interpolate the vertex positions along the edges.
+    axis = edge_ids//n_points
+    point_0 = edge_ids % n_points
+    point_1 = point_0 + strides[axis]
+    phi_flat = phi.reshape(-1)
+    phi_0 = phi_flat[point_0]
+    phi_1 = phi_flat[point_1]
+    weight = (level - phi_0)/(phi_1 - phi_0)
+
+    vertices = np.empty([edge_ids.size, 3])
+    index = np.unravel_index(point_0, phi.shape)
+    for direction, coordinate in enumerate([x, y, z]):
+        grid_index = index[direction] + weight*(axis == direction)
+        if coordinate is None:
+            vertices[:, direction] = grid_index
+        elif coordinate.ndim == 1:
+            vertices[:, direction] = np.interp(grid_index, np.arange(coordinate.size), coordinate)
+        else:
+            coordinate_flat = coordinate.reshape(-1)
+            vertices[:, direction] = coordinate_flat[point_0] + \
+                weight*(coordinate_flat[point_1] - coordinate_flat[point_0])
+
+    return vertices
+
+
+def decimate(vertices, faces, target_faces=None, max_error=None, iterations=24):
+    """
+    Reduce the number of triangles by clustering the vertices on a uniform grid.
+    All vertices in a grid cell are merged into their mean position and
+    collapsed or duplicate triangles are removed.
+    Returns the vertices, the faces and a dictionary with the number of faces
+    before and after, the reduction ratio and the time taken.
+
+    call signature:
+
+    decimate(vertices, faces, target_faces=None, max_error=None, iterations=24):
+
+    Keyword arguments:
+
+    *vertices*:
+      Array of shape [n_vertices, 3] with the vertex coordinates.
+
+    *faces*:
+      Integer array of shape [n_faces, 3] with the triangles.
+
+    *target_faces*:
+      Maximum number of triangles. The largest grid resolution which
+      satisfies it is found by bisection.
+
+    *max_error*:
+      Maximum displacement of the vertices. Used if target_faces is not given.
+
+    *iterations*:
+      Number of bisection steps for target_faces.
+    """
+
+    import time
+    import numpy as np
+
+    start = time.time()
+    vertices = np.asarray(vertices, dtype=np.float64)
+    faces = np.asarray(faces)
+    n_faces = faces.shape[0]
+    origin = vertices.min(axis=0) if vertices.size > 0 else np.zeros(3)
+    extent = np.max(vertices.max(axis=0) - origin) if vertices.size > 0 else 0
+
+    if target_faces is not None:
+        if n_faces <= target_faces or extent == 0:
+            cell_size = None
+        else:
+            # Bisect the logarithm of the cell size.
+            fine = np.log(extent/np.sqrt(n_faces)/16)
+            coarse = np.log(extent)
+            result = _cluster(vertices, faces, origin, np.exp(coarse))
+            for iteration in range(iterations):
+                middle = (fine + coarse)/2
+                clustered = _cluster(vertices, faces, origin, np.exp(middle))
+                if clustered[1].shape[0] <= target_faces:
+                    coarse = middle
+                    result = clustered
+                    if clustered[1].shape[0] > 0.99*target_faces:
+                        break
+                else:
+                    fine = middle
+            cell_size = np.exp(coarse)
+    elif max_error is not None and max_error > 0:
+        # The distance to the mean of a cluster is at most the cell diagonal.
+        cell_size = max_error/np.sqrt(3)
+        result = _cluster(vertices, faces, origin, cell_size)
+    else:
+        cell_size = None
+
+    if cell_size is None:
+        result = (vertices, faces)
+    info = {'faces': n_faces, 'decimated_faces': result[1].shape[0],
+            'ratio': result[1].shape[0]/max(n_faces, 1), 'cell_size': cell_size,
+            'time': time.time() - start}
+
+    return result[0], result[1], info
+
+
+def _cluster(vertices, faces, origin, cell_size):
+    """
+    Merge the vertices within the cells of a uniform grid and remove
+    degenerate and duplicate triangles.
+    """
+
+    import numpy as np
+
+    # Nothing to merge in an empty mesh.
+    if vertices.shape[0] == 0 or faces.shape[0] == 0:
+        return vertices, faces
+
+    # Assign every vertex to its grid cell.
+    keys = np.floor((vertices - origin)/cell_size).astype(np.int64)
+    keys = np.ravel_multi_index(keys.T, keys.max(axis=0) + 1)
+    keys, vertex_cluster = np.unique(keys, return_inverse=True)
+    vertex_cluster = vertex_cluster.ravel()
+
+    # Remove collapsed triangles and keep one of the identical triangles.
+    faces = vertex_cluster[faces]
+    faces = faces[(faces[:, 0] != faces[:, 1]) & (faces[:, 1] != faces[:, 2])
+                  & (faces[:, 2] != faces[:, 0])]
+    sorted_faces = np.sort(faces, axis=1)
+    order = np.lexsort(sorted_faces.T[::-1])
+    duplicate = np.all(sorted_faces[order[1:]] == sorted_faces[order[:-1]], axis=1)
+    faces = faces[np.sort(order[np.concatenate([[True], ~duplicate])[:order.size]])]
+
+    # Place the remaining vertices in the mean of their clusters.
+    counts = np.bincount(vertex_cluster, minlength=keys.size)
+    clustered = np.empty([keys.size, 3])
+    for direction in range(3):
+        clustered[:, direction] = np.bincount(vertex_cluster, vertices[:, direction],
+                                              minlength=keys.size)/counts
+    used, faces = np.unique(faces, return_inverse=True)
+
+    return clustered[used], faces.reshape(-1, 3)
+
+
+def _tables():
+    """
+    Return the number of triangles and the triangle table for all 256
+    marching cubes cases. The tables are generated once and cached.
+    """
+
+    import numpy as np
+
+    if _table_cache:
+        return _table_cache
+
+    # Edge index for each pair of corners.
+    edge_index = {}
+    for edge, (a, b) in enumerate(EDGES):
+        edge_index[(a, b)] = edge
+        edge_index[(b, a)] = edge
+
+    # Faces adjacent to each edge.
+    edge_faces = [set() for edge in EDGES]
+    for face_index, face in enumerate(FACES):
+        for position in range(4):
+            edge_faces[edge_index[(face[position], face[(position+1) % 4])]].add(face_index)
+
+    # Orient the faces counter clockwise when seen from outside.
+    faces = []
+    center = np.array([0.5, 0.5, 0.5])
+    for face in FACES:
+        c = np.array([CORNERS[corner] for corner in face])
+        normal = np.cross(c[1] - c[0], c[2] - c[1])
+        if np.dot(normal, c.mean(axis=0) - center) < 0:
+            face = face[::-1]
+        faces.append(face)
+
+    triangles = []
+    for case in range(256):
+        inside = [(case >> corner) & 1 for corner in range(8)]
+
+        # On each face connect every edge crossed from inside to outside with
+        # the next edge crossed from outside to inside. This separates
+        # the outside corners on ambiguous faces consistently for neighbors.
+        successor = {}
+        for face in faces:
+            crossings = []
+            for position in range(4):
+                a = face[position]
+                b = face[(position+1) % 4]
+                if inside[a] != inside[b]:
+                    crossings.append((edge_index[(a, b)], inside[a]))
+            for position, (edge, leaving) in enumerate(crossings):
+                if leaving:
+                    successor[edge] = crossings[(position+1) % len(crossings)][0]
+
+        # Chain the segments into loops and triangulate them as fans.
+        # The apex of the fan must not share a face with any vertex other
+        # than its neighbors, otherwise a diagonal would lie on the face.
+        case_triangles = []
+        while successor:
+            loop = [min(successor)]
+            while successor[loop[-1]] != loop[0]:
+                loop.append(successor.pop(loop[-1]))
+            successor.pop(loop[-1])
+            for apex in range(len(loop)):
+                loop_apex = loop[apex:] + loop[:apex]
+                if not any(edge_faces[loop_apex[0]] & edge_faces[edge]
+                           for edge in loop_apex[2:-1]):
+                    break
+            for position in range(1, len(loop_apex)-1):
+                case_triangles.append((loop_apex[0], loop_apex[position+1], loop_apex[position]))
+        triangles.append(case_triangles)
+
+    n_triangles = np.array([len(case_triangles) for case_triangles in triangles])
+    triangle_table = np.zeros([256, n_triangles.max(), 3], dtype=np.intp)
+    for case, case_triangles in enumerate(triangles):
+        if case_triangles:
+            triangle_table[case, :len(case_triangles)] = case_triangles
+
+    _table_cache.extend([n_triangles, triangle_table])
+    return _table_cache
+
+
+def _set_tables(tables):
+    """
+    Fill the cache of the marching cubes tables, e.g. in worker processes.
+    """
+
+    _table_cache[:] = tables
+
+
+# Cache of the marching cubes tables.
+_table_cache = []
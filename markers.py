@@ -0,0 +1,264 @@
+# markers.py
+"""
+Contains the marker templates as vertex and face arrays and routines to
+place many transformed copies of them into one mesh.
+
+Created on Tue Mar 10 11:20:00 2020
+
+@author: Simon Candelaresi
+"""
+
+
+'''
+Test:
+import numpy as np
+import importlib
+import blendaviz as blt
+importlib.reload(blt.markers)
+vertices, loops, loop_total = blt.markers.template('torus')
+locations = np.random.random([10000, 3])*10
+rotations = np.random.random([10000, 3])*np.pi
+scales = np.random.random(10000)*0.2
+vertices, loops, loop_total = blt.markers.batch_transform(vertices, loops, loop_total,
+                                                          locations, rotations, scales)
+mesh_object = blt.geometry.new_mesh('Markers', vertices, loops, loop_total)
+'''
+
+def template(name, resolution=32):
+    """
+    Return the vertices, face loops and number of vertices of each face of
+    a marker template of unit radius. The arrays are cached.
+
+    call signature:
+
+    template(name, resolution=32):
+
+    Keyword arguments:
+
+    *name*:
+      One of 'cube', 'cone', 'cylinder', 'ico_sphere', 'uv_sphere', 'torus'
+      or 'monkey'. The monkey is read from Blender.
+
+    *resolution*:
+      Number of vertices around the circumference of round markers.
+    """
+
+    import numpy as np
+
+    key = (name, resolution)
+    if key in _template_cache:
+        return _template_cache[key]
+
+    if name == 'cube':
+        corners = np.array(np.unravel_index(np.arange(8), (2, 2, 2))).T - 0.5
+        faces = np.array([[0, 1, 3, 2], [4, 6, 7, 5], [0, 4, 5, 1],
+                          [2, 3, 7, 6], [0, 2, 6, 4], [1, 5, 7, 3]])
+        result = (corners, faces.ravel(), np.full(6, 4))
+    elif name in ['cone', 'cylinder']:
+        angle = 2*np.pi*np.arange(resolution)/resolution
+        ring = np.stack([np.cos(angle), np.sin(angle), -np.ones(resolution)], axis=-1)
+        following = (np.arange(resolution) + 1) % resolution
+        bottom_cap = np.arange(resolution)[::-1]
+        if name == 'cone':
+            vertices = np.concatenate([ring, [[0, 0, 1]]])
+            sides = np.stack([np.arange(resolution), following,
+                              np.full(resolution, resolution)], axis=-1)
+            result = (vertices, np.concatenate([sides.ravel(), bottom_cap]),
+                      np.concatenate([np.full(resolution, 3), [resolution]]))
+        else:
+            top = ring*[1, 1, -1]
+            vertices = np.concatenate([ring, top])
+            sides = np.stack([np.arange(resolution), following,
+                              following + resolution, np.arange(resolution) + resolution], axis=-1)
+            top_cap = np.arange(resolution) + resolution
+            result = (vertices, np.concatenate([sides.ravel(), top_cap, bottom_cap]),
+                      np.concatenate([np.full(resolution, 4), [resolution, resolution]]))
+    elif name == 'uv_sphere':
+        rings = resolution//2
+        segments = np.arange(resolution)
+        following = (segments + 1) % resolution
+        polar = np.pi*np.arange(1, rings)/rings
+        azimuth = 2*np.pi*segments/resolution
+        ring_vertices = np.stack([np.outer(np.sin(polar), np.cos(azimuth)),
+                                  np.outer(np.sin(polar), np.sin(azimuth)),
+                                  np.outer(np.cos(polar), np.ones(resolution))], axis=-1)
+        vertices = np.concatenate([[[0, 0, 1]], ring_vertices.reshape(-1, 3), [[0, 0, -1]]])
+        bottom_pole = vertices.shape[0] - 1
+        # Rings of quads between the triangle fans at the poles.
+        ring_start = 1 + resolution*np.arange(rings-2)[:, np.newaxis]
+        quads = np.stack([ring_start + segments, ring_start + resolution + segments,
+                          ring_start + resolution + following, ring_start + following], axis=-1)
+        top = np.stack([np.zeros(resolution, dtype=int), 1 + segments, 1 + following], axis=-1)
+        last = 1 + resolution*(rings-2)
+        bottom = np.stack([last + following, last + segments,
+                           np.full(resolution, bottom_pole)], axis=-1)
+        result = (vertices, np.concatenate([top.ravel(), quads.ravel(), bottom.ravel()]),
+                  np.concatenate([np.full(resolution, 3), np.full(quads.size//4, 4),
+                                  np.full(resolution, 3)]))
+    elif name == 'ico_sphere':
+        vertices, faces = _icosahedron()
+        # Subdivide twice as the default Blender ico sphere.
+        for subdivision in range(2):
+            edges = np.sort(faces[:, [[0, 1], [1, 2], [2, 0]]], axis=-1).reshape(-1, 2)
+            edges, midpoint = np.unique(edges, axis=0, return_inverse=True)
+            midpoint = midpoint.reshape(-1, 3) + vertices.shape[0]
+            vertices = np.concatenate([vertices, vertices[edges].mean(axis=1)])
+            vertices /= np.linalg.norm(vertices, axis=1)[:, np.newaxis]
+            a, b, c = faces.T
+            ab, bc, ca = midpoint.T
+            faces = np.concatenate([np.stack([a, ab, ca], axis=-1), np.stack([ab, b, bc], axis=-1),
+                                    np.stack([ca, bc, c], axis=-1), np.stack([ab, bc, ca], axis=-1)])
+        result = (vertices, faces.ravel(), np.full(faces.shape[0], 3))
+    elif name == 'torus':
+        minor_resolution = max(resolution//4, 3)
+        major = 2*np.pi*np.arange(resolution)/resolution
+        minor = 2*np.pi*np.arange(minor_resolution)/minor_resolution
+        distance = 1 + 0.25*np.cos(minor)
+        vertices = np.stack([np.outer(np.cos(major), distance), np.outer(np.sin(major), distance),
+                             np.outer(np.ones(resolution), 0.25*np.sin(minor))], axis=-1)
+        i = np.arange(resolution)[:, np.newaxis]
+        j = np.arange(minor_resolution)
+        i_next = (i + 1) % resolution
+        j_next = (j + 1) % minor_resolution
+        quads = np.stack([i*minor_resolution + j, i_next*minor_resolution + j,
+                          i_next*minor_resolution + j_next, i*minor_resolution + j_next], axis=-1)
+        result = (vertices.reshape(-1, 3), quads.ravel(), np.full(quads.size//4, 4))
+    elif name == 'monkey':
+        import bpy
+        bpy.ops.mesh.primitive_monkey_add(size=1, location=(0, 0, 0))
+        monkey = bpy.context.object
+        monkey_data = monkey.data
+        result = mesh_arrays(monkey)
+        bpy.data.objects.remove(monkey)
+        bpy.data.meshes.remove(monkey_data)
+    else:
+        print("Error: unknown marker template '{0}'.".format(name))
+        return -1
+
+    _template_cache[key] = (np.asarray(result[0], dtype=np.float64),
+                            np.asarray(result[1], dtype=np.int64),
+                            np.asarray(result[2], dtype=np.int64))
+    return _template_cache[key]
+
+
+def mesh_arrays(mesh_object):
+    """
+    Read the vertices, face loops and number of vertices of each face of
+    a Blender mesh object in bulk.
+
+    call signature:
+
+    mesh_arrays(mesh_object):
+
+    Keyword arguments:
+
+    *mesh_object*:
+      Blender object of type 'MESH'.
+    """
+
+    import numpy as np
+
+    mesh_data = mesh_object.data
+    vertices = np.empty(len(mesh_data.vertices)*3, dtype=np.float32)
+    mesh_data.vertices.foreach_get('co', vertices)
+    loops = np.empty(len(mesh_data.loops), dtype=np.int32)
+    mesh_data.loops.foreach_get('vertex_index', loops)
+    loop_total = np.empty(len(mesh_data.polygons), dtype=np.int32)
+    mesh_data.polygons.foreach_get('loop_total', loop_total)
+
+    return vertices.reshape(-1, 3).astype(np.float64), loops.astype(np.int64), \
+        loop_total.astype(np.int64)
+
+
+def batch_transform(vertices, loops, loop_total, locations, rotations=None, scales=None):
+    """
+    Scale, rotate and translate copies of a template and merge them
+    into the arrays of one mesh.
+
+    call signature:
+
+    batch_transform(vertices, loops, loop_total, locations, rotations=None, scales=None):
+
+    Keyword arguments:
+
+    *vertices, loops, loop_total*:
+      Arrays of the template as returned by template.
+
+    *locations*:
+      Array of shape [n, 3] with the locations of the copies.
+
+    *rotations*:
+      Array of shape [n, 3] with the Euler angles of the copies in XYZ order.
+
+    *scales*:
+      Array of shape [n] or [n, 3] with the scale of the copies.
+    """
+
+    import numpy as np
+
+    locations = np.asarray(locations, dtype=np.float64).reshape(-1, 3)
+    n_copies = locations.shape[0]
+    copies = np.broadcast_to(vertices, (n_copies,) + vertices.shape)
+    if not scales is None:
+        scales = np.asarray(scales, dtype=np.float64).reshape(n_copies, -1)
+        copies = copies*scales[:, np.newaxis, :]
+    if not rotations is None:
+        copies = np.einsum('nij,nvj->nvi', rotation_matrices(rotations), copies)
+    copies = copies + locations[:, np.newaxis, :]
+
+    # Offset the vertex indices of each copy.
+    offsets = np.arange(n_copies)[:, np.newaxis]*vertices.shape[0]
+    merged_loops = (loops[np.newaxis, :] + offsets).ravel()
+    merged_loop_total = np.tile(loop_total, n_copies)
+
+    return copies.reshape(-1, 3), merged_loops, merged_loop_total
+
+
+def rotation_matrices(rotations):
+    """
+    Return the rotation matrices of shape [n, 3, 3] for Euler angles of
+    shape [n, 3] in XYZ order as used by Blender.
+    """
+
+    import numpy as np
+
+    rotations = np.asarray(rotations, dtype=np.float64).reshape(-1, 3)
+    cos = np.cos(rotations)
+    sin = np.sin(rotations)
+    zero = np.zeros(rotations.shape[0])
+    one = np.ones(rotations.shape[0])
+    rotation_x = np.stack([one, zero, zero, zero, cos[:, 0], -sin[:, 0],
+                           zero, sin[:, 0], cos[:, 0]], axis=-1).reshape(-1, 3, 3)
+    rotation_y = np.stack([cos[:, 1], zero, sin[:, 1], zero, one, zero,
+                           -sin[:, 1], zero, cos[:, 1]], axis=-1).reshape(-1, 3, 3)
+    rotation_z = np.stack([cos[:, 2], -sin[:, 2], zero, sin[:, 2], cos[:, 2], zero,
+                           zero, zero, one], axis=-1).reshape(-1, 3, 3)
+
+    return rotation_z @ rotation_y @ rotation_x
+
+
+def _icosahedron():
+    """
+    Return the vertices and faces of the icosahedron with unit radius.
+    """
+
+    import numpy as np
+
+    phi = (1 + np.sqrt(5))/2
+    vertices = np.array([[-1, phi, 0], [1, phi, 0], [-1, -phi, 0], [1, -phi, 0],
+                         [0, -1, phi], [0, 1, phi], [0, -1, -phi], [0, 1, -phi],
+                         [phi, 0, -1], [phi, 0, 1], [-phi, 0, -1], [-phi, 0, 1]])
+    vertices = vertices/np.linalg.norm(vertices, axis=1)[:, np.newaxis]
+    faces = np.array([[0, 11, 5], [0, 5, 1], [0, 1, 7], [0, 7, 10], [0, 10, 11],
+                      [1, 5, 9], [5, 11, 4], [11, 10, 2], [10, 7, 6], [7, 1, 8],
+                      [3, 9, 4], [3, 4, 2], [3, 2, 6], [3, 6, 8], [3, 8, 9],
+                      [4, 9, 5], [2, 4, 11], [6, 2, 10], [8, 6, 7], [9, 8, 1]])
+
+    return vertices, faces
+
+
+# Names of the marker templates.
+TEMPLATES = ('cone', 'cube', 'cylinder', 'ico_sphere', 'monkey', 'torus', 'uv_sphere')
+
+# Cache of the marker templates.
+_template_cache = {}
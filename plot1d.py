@@ -23,11 +23,20 @@ pl = blt.plot(x, y, z, marker='cube')
 pl = blt.plot(x, y, z, marker='cube', color=colors)
 pl.z = np.linspace(0, 1, 5)
 pl.plot()
+x, y, z = np.random.random([3, 100000])
+pl = blt.plot(x, y, z, marker='ico_sphere', radius=0.005, color=z)
+pl = blt.plot(x, y, z, marker='torus', radius=0.005, color=z, instance=False)
+pl = blt.plot(x[:1000], y[:1000], z[:1000], radius=0.01*(1 + z[:1000]), color=z[:1000])
+pl = blt.plot(x[:10], y[:10], z[:10])
+pl.append(x[10:20], y[10:20], z[10:20])
+pl.feed(((x[i], y[i], z[i]) for i in range(20, 100)), redraw=True)
+lines = [np.cumsum(np.random.random([100, 3]) - 0.5, axis=0) for i in range(1000)]
+pl = blt.plot_many(lines, radius=0.05, color=np.random.random(1000))
 '''
 
 def plot(x, y, z, radius=0.1, resolution=8, color=(0, 1, 0, 1), #alpha=1,
          emission=None, roughness=1, rotation_x=0, rotation_y=0, rotation_z=0,
-         marker=None, marker_orientation=(0, 0), layers=None):
+         marker=None, marker_orientation=(0, 0), layers=None, instance=True):
     """
     Line plot in 3 dimensions as a line, tube or shapes.
 
@@ -35,7 +44,7 @@ def plot(x, y, z, radius=0.1, resolution=8, color=(0, 1, 0, 1), #alpha=1,
 
     plot(x, y, z, radius=0.1, resolution=8, color=(0, 1, 0, 1),
          emission=None, rotation_x=0, rotation_y=0, rotation_z=0,
-         roughness=1, marker='sphere', marker_orientation=(0, 0))
+         roughness=1, marker='sphere', marker_orientation=(0, 0), instance=True)
 
     Keyword arguments:
 
@@ -45,7 +54,8 @@ def plot(x, y, z, radius=0.1, resolution=8, color=(0, 1, 0, 1), #alpha=1,
 
     *radius*:
       Radius of the plotted tube, i.e. line width.
-      Positive real number or array.
+      Positive real number or array. An array for a line plot
+      gives a tube with varying width.
 
     *rotation_[xyz]*:
       Rotation angle around the xyz axis.
@@ -59,6 +69,7 @@ def plot(x, y, z, radius=0.1, resolution=8, color=(0, 1, 0, 1), #alpha=1,
       rgb values of the form (r, g, b) with 0 <= r, g, b <= 1, or string,
       e.g. 'red' or character, e.g. 'r', or n-array of strings/character,
       or [n, 3] array with rgb values.
+      Arrays for a line plot are stored as per-point colors of the tube.
 
     *emission*
       Light emission by the line or markers.
@@ -85,6 +96,11 @@ def plot(x, y, z, radius=0.1, resolution=8, color=(0, 1, 0, 1), #alpha=1,
 
     *layers*:
       List or numpy array of layers where the plot will be visible.
+
+    *instance*:
+      If True, show the string markers as instances of one template mesh.
+      If False, create real geometry for all markers in one mesh.
+      Custom object markers always create real geometry.
     """
 
     import inspect
@@ -98,6 +114,58 @@ def plot(x, y, z, radius=0.1, resolution=8, color=(0, 1, 0, 1), #alpha=1,
     return path_line_return
 
 
+def plot_many(lines, offsets=None, radius=0.1, resolution=8, color=(0, 1, 0, 1),
+              emission=None, roughness=1):
+    """
+    Plot many lines as tubes in a single mesh object.
+
+    call signature:
+
+    plot_many(lines, offsets=None, radius=0.1, resolution=8, color=(0, 1, 0, 1),
+              emission=None, roughness=1)
+
+    Keyword arguments:
+
+    *lines*:
+      List of lines given as tuples (x, y, z) of 1d arrays or as arrays of
+      shape [n, 3], or, if offsets is given, one array of shape [n_points, 3]
+      with the points of all lines one after the other.
+
+    *offsets*:
+      Integer array with the index of the first point of each line in lines
+      and the total number of points at the end.
+
+    *radius*:
+      Radius of the tubes. Real number or array with one value per line.
+
+    *resolution*:
+      Azimuthal resolution of the tubes in vertices.
+      Positive integer > 2.
+
+    *color*:
+      rgb values of the form (r, g, b) with 0 <= r, g, b <= 1, or string,
+      e.g. 'red' or character, e.g. 'r', or list of strings/character,
+      or [n, 3] array with rgb values or array with one value per line.
+
+    *emission*
+      Light emission by the lines.
+      Real number or array with one value per line.
+
+    *roughness*:
+      Texture roughness.
+      Real number or array with one value per line.
+    """
+
+    import inspect
+
+    # Assign parameters to the PathLine objects.
+    path_line_return = PathLine()
+    argument_dict = inspect.getargvalues(inspect.currentframe()).locals
+    for argument in argument_dict:
+        setattr(path_line_return, argument, argument_dict[argument])
+    path_line_return.plot_many()
+    return path_line_return
+
 
 class PathLine(object):
     """
@@ -126,9 +194,15 @@ class PathLine(object):
         self.curve_data = None
         self.curve_object = None
         self.marker_mesh = None
+        self.marker_template = None
+        self.tube_mesh = None
         self.mesh_material = None
-        self.poly_line = None
         self.layers = None
+        self.instance = True
+        self.lines = None
+        self.offsets = None
+        self.n_points = 0
+        self.point_buffer = None
 
 
     def plot(self):
@@ -136,9 +210,11 @@ class PathLine(object):
         Plot a as a line, tube or shapes.
         """
 
-        import bpy
         import numpy as np
+        from . import backends
         from . import colors
+        from . import geometry
+        from . import markers
 
         # Check validity of radius input.
         if not isinstance(self.radius, np.ndarray) and not self.marker is None:
@@ -158,30 +234,29 @@ class PathLine(object):
             self.layers = [0]
         self.layers = list(self.layers)
 
-        # Delete existing curve.
-        if not self.curve_data is None:
-            bpy.data.curves.remove(self.curve_data)
-            self.curve_data = None
-
-        # Delete existing meshes.
-        if not self.marker_mesh is None:
-            bpy.ops.object.select_all(action='DESELECT')
-            if isinstance(self.marker_mesh, list):
-                for marker_mesh in self.marker_mesh:
-                    marker_mesh.select = True
-                    bpy.ops.object.delete()
-            else:
-                self.marker_mesh.select = True
-                bpy.ops.object.delete()
-            self.marker_mesh = None
+        # Check validity of the marker.
+        if isinstance(self.marker, str) and not self.marker in markers.TEMPLATES:
+            print("Error: marker must be one of {0}.".format(', '.join(markers.TEMPLATES)))
+            return -1
+
+        # Check validity of the per-point values of a tube.
+        tube = self.marker is None and (isinstance(self.radius, np.ndarray) or
+                                        isinstance(self.color, (np.ndarray, list)))
+        if tube:
+            if isinstance(self.radius, np.ndarray) and not self.radius.shape == self.x.shape:
+                print("Error: radius must have one entry per point.")
+                return -1
+            if isinstance(self.color, (np.ndarray, list)) and not len(self.color) == self.x.size:
+                print("Error: color must have one entry per point.")
+                return -1
+            for name in ['roughness', 'emission']:
+                if isinstance(getattr(self, name), np.ndarray) and \
+                   not getattr(self, name).shape == self.x.shape:
+                    print("Error: {0} must have one entry per point.".format(name))
+                    return -1
 
-        # Delete existing materials.
-        if not self.mesh_material is None:
-            if isinstance(self.mesh_material, list):
-                for mesh_material in self.mesh_material:
-                    bpy.data.materials.remove(mesh_material)
-            else:
-                bpy.data.materials.remove(self.mesh_material)
+        self.__delete_objects()
+        backend = backends.get_backend()
 
         # Switch to object mode.
 #        current_mode = bpy.context.mode
@@ -204,199 +279,112 @@ class PathLine(object):
 #        self.bounding_box.location = ((x.max()+x.min())/2, (y.max()+y.min())/2, (z.max()+z.min())/2)
 #        self.bounding_box.scale = [x.max()-x.min(), y.max()-y.min(), y.max()-y.min()]
 
+        # Sweep a tube with per-point radius and color in one mesh.
+        if tube:
+            if self.resolution < 3:
+                print("Error: resolution must be larger than 2.")
+                return -1
+            radius = np.broadcast_to(self.radius, self.x.shape)
+            color_rgba = colors.make_rgba_array(self.color, self.x.size)
+            if isinstance(color_rgba, int) or not color_rgba.shape[0] == self.x.size:
+                print("Error: color must have one entry per point.")
+                return -1
+            vertices, faces = geometry.tube_mesh(np.stack([self.x, self.y, self.z], axis=-1),
+                                                 [0, self.x.size], radius, self.resolution)
+            self.tube_mesh = backend.new_mesh('ObjTube', vertices, faces)
+
+            # Every ring of vertices gets the attributes of its point.
+            backend.set_attribute(self.tube_mesh.data, 'Color',
+                                  np.repeat(color_rgba, self.resolution, axis=0))
+            backend.set_attribute(self.tube_mesh.data, 'radius',
+                                  np.repeat(radius, self.resolution), 'FLOAT')
+            if isinstance(self.roughness, np.ndarray):
+                backend.set_attribute(self.tube_mesh.data, 'roughness',
+                                      np.repeat(self.roughness, self.resolution), 'FLOAT')
+            if isinstance(self.emission, np.ndarray):
+                backend.set_attribute(self.tube_mesh.data, 'emission',
+                                      np.repeat(self.emission, self.resolution), 'FLOAT')
+            self.mesh_material = self.__instance_material('GEOMETRY')
+            backend.assign_material(self.tube_mesh, self.mesh_material)
+            return 0
+
         # Create the bezier curve.
         if self.marker is None:
             # Transform color string into rgb.
             color_rgba = colors.make_rgba_array(self.color, 1)
+            if isinstance(color_rgba, int):
+                return -1
 
-            self.curve_data = bpy.data.curves.new('DataCurve', type='CURVE')
-            self.curve_data.dimensions = '3D'
-            self.curve_object = bpy.data.objects.new('ObjCurve', self.curve_data)
-
-            # Set the origin to the last point.
-            self.curve_object.location = tuple((self.x[-1], self.y[-1], self.z[-1]))
-
-            # Add the rest of the curve.
-            self.poly_line = self.curve_data.splines.new('POLY')
-            self.poly_line.points.add(self.x.shape[0])
-            for param in range(self.x.shape[0]):
-                self.poly_line.points[param].co = (self.x[param] - self.x[-1],
-                                                   self.y[param] - self.y[-1],
-                                                   self.z[param] - self.z[-1], 0)
-
-            # Add 3d structure.
-            self.curve_data.splines.data.bevel_depth = self.radius
-            self.curve_data.splines.data.bevel_resolution = self.resolution
-            self.curve_data.splines.data.fill_mode = 'FULL'
+            # Set the origin to the last point and add the curve.
+            self.curve_object = backend.new_curve('ObjCurve',
+                                                  np.stack([self.x, self.y, self.z], axis=-1),
+                                                  self.radius, self.resolution)
+            self.curve_data = self.curve_object.data
+            self.n_points = self.x.shape[0]
+            self.point_buffer = None
 
             # Set the material/color.
-            self.mesh_material = bpy.data.materials.new('material')
-            self.mesh_material.diffuse_color = color_rgba[0]
-            self.mesh_material.roughness = self.roughness
             #alpha handling has been changed, not sure if correct
             #self.mesh_material.alpha = self.alpha
 #            if self.color[-1] < 1.0:
 #                self.mesh_material.transparency_method = 'Z_TRANSPARENCY'
 #                self.mesh_material.use_transparency = True
-            self.curve_object.active_material = self.mesh_material
-
-            # Set the emission.
-            if not self.emission is None:
-                self.mesh_material.use_nodes = True
-                node_tree = self.mesh_material.node_tree
-                nodes = node_tree.nodes
-                # Remove and Diffusive BSDF node.
-                nodes.remove(nodes[1])
-                node_emission = nodes.new(type='ShaderNodeEmission')
-                # Change the input of the ouput node to emission.
-                node_tree.links.new(node_emission.outputs['Emission'],
-                                    nodes[0].inputs['Surface'])
-                # Adapt emission and color.
-                node_emission.inputs['Color'].default_value = color_rgba
-                node_emission.inputs['Strength'].default_value = self.emission
-
-            # Link the curve object with the scene.
-            bpy.context.scene.collection.objects.link(self.curve_object)
+            self.mesh_material = backend.new_material('material', color=color_rgba[0],
+                                                      roughness=self.roughness,
+                                                      emission=self.emission)
+            backend.assign_material(self.curve_object, self.mesh_material)
 
         # Transform color string into rgb.
         color_rgba = colors.make_rgba_array(self.color, self.x.size)
-
-        # Plot the markers.
-        if not self.marker is None:
-            self.marker_mesh = []
-        if self.marker == 'cone':
-            for idx in range(len(self.x)):
-                bpy.ops.mesh.primitive_cone_add(location=(self.x[idx], self.y[idx], self.z[idx]),
-                                                radius1=self.radius[idx], depth=2*self.radius[idx],
-                                                rotation=(self.rotation_x[idx], self.rotation_y[idx], self.rotation_z[idx]))
-                self.marker_mesh.append(bpy.context.object)
-        if self.marker == 'cube':
-            for idx in range(len(self.x)):
-                bpy.ops.mesh.primitive_cube_add(location=(self.x[idx], self.y[idx], self.z[idx]),
-                                                size=self.radius[idx],
-                                                rotation=(self.rotation_x[idx], self.rotation_y[idx], self.rotation_z[idx]))
-                self.marker_mesh.append(bpy.context.object)
-        if self.marker == 'cylinder':
-            for idx in range(len(self.x)):
-                bpy.ops.mesh.primitive_cylinder_add(location=(self.x[idx], self.y[idx], self.z[idx]),
-                                                    radius=self.radius[idx], depth=2*self.radius[idx],
-                                                    rotation=(self.rotation_x[idx], self.rotation_y[idx], self.rotation_z[idx]))
-                self.marker_mesh.append(bpy.context.object)
-        if self.marker == 'ico_sphere':
-            for idx in range(len(self.x)):
-                bpy.ops.mesh.primitive_ico_sphere_add(location=(self.x[idx], self.y[idx], self.z[idx]),
-                                                      radius=self.radius[idx],
-                                                      rotation=(self.rotation_x[idx], self.rotation_y[idx], self.rotation_z[idx]))
-                self.marker_mesh.append(bpy.context.object)
-        if self.marker == 'monkey':
-            for idx in range(len(self.x)):
-                bpy.ops.mesh.primitive_monkey_add(location=(self.x[idx], self.y[idx], self.z[idx]),
-                                                  size=self.radius[idx],
-                                                  rotation=(self.rotation_x[idx], self.rotation_y[idx], self.rotation_z[idx]))
-                self.marker_mesh.append(bpy.context.object)
-        if self.marker == 'torus':
-            for idx in range(len(self.x)):
-                bpy.ops.mesh.primitive_torus_add(location=(self.x[idx], self.y[idx], self.z[idx]),
-                                                 major_radius=self.radius[idx], minor_radius=0.25*self.radius[idx],
-                                                 abso_major_rad=1.25*self.radius[idx], abso_minor_rad=0.75*self.radius[idx],
-                                                 rotation=(self.rotation_x[idx], self.rotation_y[idx], self.rotation_z[idx]))
-                self.marker_mesh.append(bpy.context.object)
-        if self.marker == 'uv_sphere':
-            for idx in range(len(self.x)):
-                bpy.ops.mesh.primitive_uv_sphere_add(location=(self.x[idx], self.y[idx], self.z[idx]),
-                                                     radius=self.radius[idx],
-                                                     rotation=(self.rotation_x[idx], self.rotation_y[idx], self.rotation_z[idx]))
-                self.marker_mesh.append(bpy.context.object)
-        if isinstance(self.marker, bpy.types.Object):
-            if self.marker.type == 'MESH':
-                bpy.context.object.select = False
-                self.marker.select = True
-                for idx in range(len(self.x)):
-                    bpy.ops.object.duplicate_move(OBJECT_OT_duplicate={"linked":False, "mode":'TRANSLATION'})
-                    bpy.context.object.location = (self.x[idx], self.y[idx], self.z[idx])
-                    bpy.context.object.rotation_euler = (self.rotation_x[idx], self.rotation_y[idx], self.rotation_z[idx])
-                    self.marker.select = False
-                    self.marker_mesh.append(bpy.context.object)
-
-        # Set the material and color.
-        if not self.marker is None:
-            color_is_array = False
-            if isinstance(color_rgba, np.ndarray):
-                if color_rgba.ndim == 2:
-                    color_is_array = True
-
-            if any([#isinstance(self.alpha, np.ndarray),
-                    color_is_array,
-                    isinstance(self.roughness, np.ndarray),
-                    isinstance(self.emission, np.ndarray)]):
-                self.mesh_material = []
-
-                for idx in range(len(self.x)):
-                    self.mesh_material.append(bpy.data.materials.new('material'))
-
-#                    if isinstance(self.alpha, np.ndarray):
-#                        self.mesh_material[idx].alpha = self.alpha[idx]
-#                    else:
-#                        self.mesh_material[idx].alpha = self.alpha
-
-                    if color_is_array:
-                        self.mesh_material[idx].diffuse_color = tuple(color_rgba[idx])
-                    else:
-                        self.mesh_material[idx].diffuse_color = color_rgba
-
-                    if isinstance(self.roughness, np.ndarray):
-                        self.mesh_material[idx].roughness = self.roughness[idx]
-                    else:
-                        self.mesh_material[idx].roughness = self.roughness
-
-                    if isinstance(self.emission, np.ndarray):
-                        self.mesh_material[idx].use_nodes = True
-                        node_tree = self.mesh_material[idx].node_tree
-                        nodes = node_tree.nodes
-                        # Remove and Diffusive BSDF node.
-                        nodes.remove(nodes[1])
-                        node_emission = nodes.new(type='ShaderNodeEmission')
-                        # Change the input of the ouput node to emission.
-                        node_tree.links.new(node_emission.outputs['Emission'],
-                                            nodes[0].inputs['Surface'])
-                        # Adapt emission and color.
-                        if color_is_array:
-                            node_emission.inputs['Color'].default_value = tuple(color_rgba[idx])
-                        else:
-                            node_emission.inputs['Color'].default_value = color_rgba
-                        node_emission.inputs['Strength'].default_value = self.emission[idx]
-
-                    self.marker_mesh[idx].active_material = self.mesh_material[idx]
+        if isinstance(color_rgba, int):
+            return -1
+
+        # Plot the markers as instances of one template mesh.
+        if isinstance(self.marker, str) and self.instance:
+            self.marker_template = self.__marker_template()
+            attributes = {'rotation': (np.stack([self.rotation_x, self.rotation_y,
+                                                 self.rotation_z], axis=-1), 'FLOAT_VECTOR'),
+                          'radius': (self.radius, 'FLOAT'),
+                          'Color': (color_rgba, 'FLOAT_COLOR')}
+            if isinstance(self.roughness, np.ndarray):
+                attributes['roughness'] = (self.roughness, 'FLOAT')
+            if isinstance(self.emission, np.ndarray):
+                attributes['emission'] = (self.emission, 'FLOAT')
+            self.marker_mesh = backend.instance_on_points(
+                'ObjMarkers', np.stack([self.x, self.y, self.z], axis=-1),
+                self.marker_template, attributes, 'rotation', 'radius')
+            self.mesh_material = self.__instance_material()
+            backend.assign_material(self.marker_template, self.mesh_material)
+
+        # Merge transformed copies of the marker into one mesh.
+        if not self.marker is None and not (isinstance(self.marker, str) and self.instance):
+            if isinstance(self.marker, str):
+                vertices, loops, loop_total = markers.template(self.marker)
+                scales = self.radius
             else:
-                self.mesh_material = bpy.data.materials.new('material')
-                #self.mesh_material.alpha = self.alpha
-                self.mesh_material.diffuse_color = color_rgba
-                self.mesh_material.roughness = self.roughness
-
-                if not self.emission is None:
-                    self.mesh_material.use_nodes = True
-                    node_tree = self.mesh_material.node_tree
-                    nodes = node_tree.nodes
-                    # Remove and Diffusive BSDF node.
-                    nodes.remove(nodes[1])
-                    node_emission = nodes.new(type='ShaderNodeEmission')
-                    # Change the input of the ouput node to emission.
-                    node_tree.links.new(node_emission.outputs['Emission'],
-                                        nodes[0].inputs['Surface'])
-                    # Adapt emission and color.
-                    node_emission.inputs['Color'].default_value = color_rgba
-                    node_emission.inputs['Strength'].default_value = self.emission
-
-                for idx, mesh in enumerate(self.marker_mesh):
-                    mesh.active_material = self.mesh_material
-
-        # Group the meshes together.
-        if not self.marker is None:
-            for mesh in self.marker_mesh[::-1]:
-                mesh.select_set(state=True)
-            bpy.ops.object.join()
-            self.marker_mesh = bpy.context.object
-            self.marker_mesh.select_set(state=False)
+                marker_arrays = backend.mesh_arrays(self.marker)
+                if marker_arrays is None:
+                    print("Error: marker object must be a mesh.")
+                    return -1
+                vertices, loops, loop_total = marker_arrays
+                scales = None
+            n_vertices = vertices.shape[0]
+            vertices, loops, loop_total = markers.batch_transform(
+                vertices, loops, loop_total, np.stack([self.x, self.y, self.z], axis=-1),
+                np.stack([self.rotation_x, self.rotation_y, self.rotation_z], axis=-1), scales)
+            self.marker_mesh = backend.new_mesh('ObjMarkers', vertices, loops, loop_total)
+
+            # Every vertex of a copy gets the attributes of its point.
+            backend.set_attribute(self.marker_mesh.data, 'Color',
+                                  np.repeat(color_rgba, n_vertices, axis=0))
+            if isinstance(self.roughness, np.ndarray):
+                backend.set_attribute(self.marker_mesh.data, 'roughness',
+                                      np.repeat(self.roughness, n_vertices), 'FLOAT')
+            if isinstance(self.emission, np.ndarray):
+                backend.set_attribute(self.marker_mesh.data, 'emission',
+                                      np.repeat(self.emission, n_vertices), 'FLOAT')
+            self.mesh_material = self.__instance_material('GEOMETRY')
+            backend.assign_material(self.marker_mesh, self.mesh_material)
 
 #        # Make the plot visible in the requested layers.
 #        mask_layers = [idx in self.layers for idx in range(20)]
@@ -411,3 +399,224 @@ class PathLine(object):
 #        bpy.ops.object.mode_xset(mode=current_mode)
 
         return 0
+
+
+    def append(self, x, y, z):
+        """
+        Append points to the plotted line. Only the new points are written,
+        so the cost of an update scales with the new data.
+
+        call signature:
+
+        append(x, y, z):
+
+        Keyword arguments:
+
+        *x, y, z*:
+          x, y and z coordinates of the new points.
+          Real numbers or 1d arrays of the same length.
+        """
+
+        import numpy as np
+        from . import backends
+
+        if self.curve_object is None or not self.marker is None:
+            print("Error: points can only be appended to a plotted line.")
+            return -1
+        new_points = np.stack([np.atleast_1d(x), np.atleast_1d(y), np.atleast_1d(z)],
+                              axis=-1).astype(np.float64)
+        n_new = new_points.shape[0]
+
+        # Grow the point buffer by doubling its capacity when it is full.
+        if self.point_buffer is None:
+            self.point_buffer = np.empty([max(2*self.n_points, 16), 3])
+            self.point_buffer[:self.n_points] = np.stack([self.x, self.y, self.z], axis=-1)
+        if self.n_points + n_new > self.point_buffer.shape[0]:
+            capacity = max(2*self.point_buffer.shape[0], self.n_points + n_new)
+            point_buffer = np.empty([capacity, 3])
+            point_buffer[:self.n_points] = self.point_buffer[:self.n_points]
+            self.point_buffer = point_buffer
+        self.point_buffer[self.n_points:self.n_points+n_new] = new_points
+        self.x = self.point_buffer[:self.n_points+n_new, 0]
+        self.y = self.point_buffer[:self.n_points+n_new, 1]
+        self.z = self.point_buffer[:self.n_points+n_new, 2]
+
+        # Write only the new points into the curve.
+        backends.get_backend().append_curve_points(self.curve_object, new_points, self.n_points)
+        self.n_points += n_new
+
+        return 0
+
+
+    def feed(self, source, redraw=False):
+        """
+        Append the chunks of points delivered by an iterator, e.g. a generator
+        reading the output of a running simulation.
+
+        call signature:
+
+        feed(source, redraw=False):
+
+        Keyword arguments:
+
+        *source*:
+          Iterable of (x, y, z) tuples of real numbers or 1d arrays.
+
+        *redraw*:
+          If True, redraw the Blender windows after every chunk.
+        """
+
+        from . import backends
+
+        for x, y, z in source:
+            if self.append(x, y, z) == -1:
+                return -1
+            if redraw:
+                backends.get_backend().redraw()
+
+        return 0
+
+
+    def plot_many(self):
+        """
+        Plot all lines in self.lines as tubes in a single mesh object.
+        The color, radius, roughness and emission of each line are stored
+        as attributes of the mesh.
+        """
+
+        import numpy as np
+        from . import backends
+        from . import colors
+        from . import geometry
+
+        # Concatenate the lines into one array of points.
+        if self.offsets is None:
+            line_points = [np.column_stack(line) if isinstance(line, (tuple, list))
+                           else np.asarray(line).reshape(-1, 3) for line in self.lines]
+            lengths = np.array([points.shape[0] for points in line_points], dtype=np.int64)
+            self.offsets = np.concatenate([[0], np.cumsum(lengths)])
+            self.lines = np.concatenate(line_points)
+        self.offsets = np.asarray(self.offsets, dtype=np.int64)
+        n_lines = self.offsets.size - 1
+        lengths = np.diff(self.offsets)
+        if self.resolution < 3:
+            print("Error: resolution must be larger than 2.")
+            return -1
+        for name in ['radius', 'roughness', 'emission']:
+            if isinstance(getattr(self, name), np.ndarray) and \
+               not getattr(self, name).size == n_lines:
+                print("Error: {0} must have one entry per line.".format(name))
+                return -1
+        if isinstance(self.color, (np.ndarray, list)) and not len(self.color) == n_lines:
+            print("Error: color must have one entry per line.")
+            return -1
+
+        # Expand the values of the lines onto their points.
+        color_rgba = colors.make_rgba_array(self.color, n_lines)
+        if isinstance(color_rgba, int):
+            print("Error: color must have one entry per line.")
+            return -1
+        radius = np.repeat(np.broadcast_to(self.radius, (n_lines,)), lengths)
+
+        self.__delete_objects()
+        backend = backends.get_backend()
+        vertices, faces = geometry.tube_mesh(self.lines, self.offsets, radius, self.resolution)
+        self.tube_mesh = backend.new_mesh('ObjTubes', vertices, faces)
+
+        # Every ring of vertices gets the attributes of its line.
+        repeats = lengths*self.resolution
+        backend.set_attribute(self.tube_mesh.data, 'Color', np.repeat(color_rgba, repeats, axis=0))
+        backend.set_attribute(self.tube_mesh.data, 'radius', np.repeat(radius, self.resolution),
+                              'FLOAT')
+        if isinstance(self.roughness, np.ndarray):
+            backend.set_attribute(self.tube_mesh.data, 'roughness',
+                                  np.repeat(self.roughness, repeats), 'FLOAT')
+        if isinstance(self.emission, np.ndarray):
+            backend.set_attribute(self.tube_mesh.data, 'emission',
+                                  np.repeat(self.emission, repeats), 'FLOAT')
+        self.mesh_material = self.__instance_material('GEOMETRY')
+        backend.assign_material(self.tube_mesh, self.mesh_material)
+
+        return 0
+
+
+    def __delete_objects(self):
+        """
+        Delete the curve, meshes and materials of a previous plot.
+        """
+
+        from . import backends
+
+        backend = backends.get_backend()
+
+        # Delete existing curve.
+        if not self.curve_object is None:
+            backend.remove(self.curve_object)
+            self.curve_object = None
+            self.curve_data = None
+
+        # Delete existing meshes.
+        if not self.marker_mesh is None:
+            if isinstance(self.marker_mesh, list):
+                for marker_mesh in self.marker_mesh:
+                    backend.remove(marker_mesh)
+            else:
+                backend.remove(self.marker_mesh)
+            self.marker_mesh = None
+        if not self.marker_template is None:
+            backend.remove(self.marker_template)
+            self.marker_template = None
+
+        # Delete existing materials.
+        if not self.mesh_material is None:
+            if isinstance(self.mesh_material, list):
+                for mesh_material in self.mesh_material:
+                    backend.remove(mesh_material)
+            else:
+                backend.remove(self.mesh_material)
+            self.mesh_material = None
+
+        # Delete existing tubes.
+        if not self.tube_mesh is None:
+            backend.remove(self.tube_mesh)
+            self.tube_mesh = None
+
+
+    def __marker_template(self):
+        """
+        Create the template mesh of the marker with unit radius.
+        It is not linked with the scene and only shown through its instances.
+        """
+
+        from . import backends
+        from . import markers
+
+        return backends.get_backend().new_mesh('MarkerTemplate', *markers.template(self.marker),
+                                               link=False)
+
+
+    def __instance_material(self, attribute_type='INSTANCER'):
+        """
+        Create the material of the markers, which reads the color, roughness
+        and emission from the attributes of the points ('INSTANCER') or
+        of the mesh ('GEOMETRY').
+        """
+
+        import numpy as np
+        from . import backends
+
+        if isinstance(self.roughness, np.ndarray):
+            roughness, roughness_attribute = 1, 'roughness'
+        else:
+            roughness, roughness_attribute = self.roughness, None
+        if isinstance(self.emission, np.ndarray):
+            emission, emission_attribute = None, 'emission'
+        else:
+            emission, emission_attribute = self.emission, None
+
+        return backends.get_backend().new_material('material', roughness=roughness,
+                                                   emission=emission,
+                                                   attribute_type=attribute_type,
+                                                   color_attribute='Color',
+                                                   roughness_attribute=roughness_attribute,
+                                                   emission_attribute=emission_attribute)
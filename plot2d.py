@@ -27,15 +27,27 @@ z = (1 - x**2-y**2)*np.exp(-(x**2+y**2)/5)
 
 m = blt.mesh(x, y, z, c='r', alpha=alpha)
 m.plot()
+m = blt.mesh(x, y, z, c=z, color_mode='vertex')
+for t in range(10):
+    m.update(z=z*np.cos(t/5), c=z*np.cos(t/5))
+for t in range(10):
+    m.update(z=z*np.cos(t/5), frame=t)
+m = blt.mesh(x, y, z, c=z, tolerance=1e-3)
+color_mapper = blt.colors.ColorMapper(vmin=-1, vmax=1, norm='symlog', linthresh=0.1)
+m1 = blt.mesh(x, y, z, c=z, color_map=color_mapper)
+m2 = blt.mesh(x, y, z + 1, c=2*z, color_map=color_mapper)
+print(m.tessellation_info)
 '''
 
-def mesh(x, y, z=None, c=None, alpha=None, color_map=None):
+def mesh(x, y, z=None, c=None, alpha=None, color_map=None, color_mode='texture',
+         tolerance=None, max_faces=None):
     """
     Plot a 2d surface with optional color.
 
     call signature:
 
-    mesh(x, y, z, c=None, color_map=None)
+    mesh(x, y, z, c=None, color_map=None, color_mode='texture',
+         tolerance=None, max_faces=None)
 
     Keyword arguments:
 
@@ -52,7 +64,21 @@ def mesh(x, y, z=None, c=None, alpha=None, color_map=None):
 
     *color_map*:
       Color map for the values stored in the array 'c'.
-      These are the same as in matplotlib.
+      These are the same as in matplotlib, or a ColorMapper shared by
+      several plots.
+
+    *color_mode*:
+      'texture' to map the colors of array 'c' through an image texture or
+      'vertex' to store them as a vertex color attribute.
+
+    *tolerance*:
+      If specified, merge blocks of cells into larger faces where the surface
+      is planar within this distance.
+
+    *max_faces*:
+      If specified, merge blocks of cells until the surface has at most
+      this many faces, if the alignment of the blocks allows it.
+      A missed budget is flagged in tessellation_info.
     """
 
     import inspect
@@ -82,7 +108,14 @@ class Surface(object):
         self.c = None
         self.alpha = None
         self.color_map = None
+        self.color_mode = 'texture'
+        self.tolerance = None
+        self.max_faces = None
+        self.vertex_index = None
+        self.tessellation_info = None
+        self.color_mapper = None
         self.mesh_data = None
+        self.mesh_image = None
         self.mesh_object = None
         self.mesh_material = None
 
@@ -92,9 +125,10 @@ class Surface(object):
         Plot the 2d mesh.
         """
 
-        import bpy
         import numpy as np
-        import matplotlib.cm as cm
+        from . import backends
+        from . import colors
+        from . import geometry
 
         # Check the validity of the input arrays.
         if not isinstance(self.x, np.ndarray) or not isinstance(self.y, np.ndarray):
@@ -123,103 +157,196 @@ class Surface(object):
                 return -1
         else:
             self.alpha = np.array([self.alpha])
+        if not self.color_mode in ['texture', 'vertex']:
+            print("Error: color_mode must be 'texture' or 'vertex'.")
+            return -1
+        if not isinstance(self.c, np.ndarray):
+            # Transform color string into rgba.
+            color_rgba = colors.string_to_rgba(self.c)
+            if color_rgba == -1:
+                return -1
+        backend = backends.get_backend()
 
         # Delete existing meshes.
         if not self.mesh_object is None:
-            bpy.ops.object.select_all(action='DESELECT')
-            self.mesh_object.select_set(state=True)
-            bpy.ops.object.delete()
+            backend.remove(self.mesh_object)
             self.mesh_object = None
 
-        # Delete existing materials.
+        # Delete existing materials and images. The vertex color materials are shared.
         if not self.mesh_material is None:
-            bpy.data.materials.remove(self.mesh_material)
+            if not self.mesh_material.name.startswith(VERTEX_COLOR_MATERIAL):
+                backend.remove(self.mesh_material)
+            self.mesh_material = None
+        if not self.mesh_image is None:
+            backend.remove(self.mesh_image)
+            self.mesh_image = None
 
         # Create the vertices from the data.
-        vertices = []
-        for idx in range(self.x.size):
-            vertices.append((self.x.flatten()[idx], self.y.flatten()[idx], self.z.flatten()[idx]))
-
-        # Create the faces from the data.
-        faces = []
-        count = 0
-        for idx in range((self.x.shape[0]-1)*(self.x.shape[1])):
-            if count < self.x.shape[1]-1:
-                faces.append((idx, idx+1, (idx+self.x.shape[1])+1, (idx+self.x.shape[1])))
-                count += 1
+        vertices = np.stack([self.x.ravel(), self.y.ravel(), self.z.ravel()], axis=-1)
+        nu, nv = self.x.shape
+
+        if self.tolerance is None and self.max_faces is None:
+            # Create the quads from the grid indices of their lower corners.
+            corner = (np.arange(nu-1)[:, np.newaxis]*nv + np.arange(nv-1)).ravel()
+            faces = np.stack([corner, corner+1, corner+nv+1, corner+nv], axis=-1)
+            self.vertex_index = None
+            self.tessellation_info = None
+            self.mesh_object = backend.new_mesh("ObjMesh", vertices, faces)
+        else:
+            # Merge planar blocks of cells and keep only the used grid points.
+            self.vertex_index, faces, loop_total, self.tessellation_info = \
+                geometry.quadtree_faces(self.x, self.y, self.z, self.tolerance, self.max_faces)
+            mesh_index = np.zeros(vertices.shape[0], dtype=np.int64)
+            mesh_index[self.vertex_index] = np.arange(self.vertex_index.size)
+            self.mesh_object = backend.new_mesh("ObjMesh", vertices[self.vertex_index],
+                                                mesh_index[faces], loop_total)
+        self.mesh_data = self.mesh_object.data
+
+        # Fix the color range, so updates are colored on the same scale.
+        if isinstance(self.c, np.ndarray):
+            if isinstance(self.color_map, colors.ColorMapper):
+                self.color_mapper = self.color_map
             else:
-                count = 0
-
-        # Create mesh and object.
-        self.mesh_data = bpy.data.meshes.new("DataMesh")
-        self.mesh_object = bpy.data.objects.new("ObjMesh", self.mesh_data)
-#        self.mesh_object.select_set(state=True)
+                self.color_mapper = colors.ColorMapper(self.color_map,
+                                                       *colors.data_range(self.c))
 
-        # Create mesh from the given data.
-        self.mesh_data.from_pydata(vertices, [], faces)
-        self.mesh_data.update(calc_edges=True)
-
-        # Assign a material to the surface.
-        self.mesh_material = bpy.data.materials.new('MaterialMesh')
-        self.mesh_data.materials.append(self.mesh_material)
+        # Store the colors in a vertex attribute read by a shared material.
+        if isinstance(self.c, np.ndarray) and self.color_mode == 'vertex':
+            self.__write_colors()
+            self.mesh_material = self.__vertex_color_material(np.any(self.alpha < 1))
+            backend.assign_material(self.mesh_object, self.mesh_material)
+            return 0
 
         # Create the texture.
         if isinstance(self.c, np.ndarray):
-            mesh_image = bpy.data.images.new('ImageMesh', self.c.shape[0], self.c.shape[1])
-            pixels = np.array(mesh_image.pixels)
-            c_max = np.max(self.c)
-            c_min = np.min(self.c)
-
-            # Assign the RGBa values to the pixels.
-            if self.color_map is None:
-                self.color_map = cm.viridis
-            pixels[0::4] = self.color_map((self.c.flatten() - c_min)/(c_max - c_min))[:, 0]
-            pixels[1::4] = self.color_map((self.c.flatten() - c_min)/(c_max - c_min))[:, 1]
-            pixels[2::4] = self.color_map((self.c.flatten() - c_min)/(c_max - c_min))[:, 2]
-            pixels[3::4] = self.alpha.flatten()
-            mesh_image.pixels[:] = np.swapaxes(pixels.reshape([self.x.shape[0],
-                                                               self.x.shape[1], 4]), 0, 1).flatten()[:]
-
-            # Assign the texture to the material.
-            self.mesh_material.use_nodes = True
-            self.mesh_texture = self.mesh_material.node_tree.nodes.new('ShaderNodeTexImage')
-            self.mesh_texture.image = mesh_image
-            links = self.mesh_material.node_tree.links
-            links.new(self.mesh_texture.outputs[0],
-                      self.mesh_material.node_tree.nodes.get("Principled BSDF").inputs[0])
-
-            # Link the mesh object with the scene.
-            bpy.context.scene.collection.objects.link(self.mesh_object)
-
-            # UV mapping for the new texture.
-            bpy.context.view_layer.objects.active = self.mesh_object
-            bpy.ops.object.mode_set(mode='EDIT')
-            bpy.ops.uv.unwrap(method='ANGLE_BASED', margin=0)
-            bpy.ops.object.mode_set(mode='OBJECT')
-
-            # UV mapping of the material on the mesh.
-            polygon_idx = 0
-            for polygon in self.mesh_object.data.polygons:
-                for idx in polygon.loop_indices:
-                    x_idx = polygon_idx // (self.x.shape[1] - 1)
-                    y_idx = polygon_idx % (self.x.shape[1] - 1)
-                    if (idx-4*polygon_idx) == 1 or (idx-4*polygon_idx) == 2:
-                        y_idx += 1
-                    if (idx-4*polygon_idx) == 2 or (idx-4*polygon_idx) == 3:
-                        x_idx += 1
-                    uv_new = np.array([(float(x_idx)+0.5)/self.x.shape[0],
-                                       (float(y_idx)+0.5)/self.x.shape[1]])
-                    self.mesh_object.data.uv_layers[0].data[idx].uv[0] = uv_new[0]
-                    self.mesh_object.data.uv_layers[0].data[idx].uv[1] = uv_new[1]
-                polygon_idx += 1
+            self.mesh_image = backend.new_image('ImageMesh', self.c.shape[0], self.c.shape[1],
+                                                alpha=False, float_buffer=False)
+            self.__write_colors()
+
+            # UV mapping of the pixel centers onto the loops of all faces at once.
+            loop_vertices = faces.ravel()
+            uv = np.stack([(loop_vertices//nv + 0.5)/nu, (loop_vertices % nv + 0.5)/nv], axis=-1)
+            backend.set_uv(self.mesh_data, uv)
+
+            # Assign a material with the texture to the surface.
+            self.mesh_material = backend.new_material('MaterialMesh', image=self.mesh_image)
         else:
-            # Transform color string into rgba.
-            from . import colors
+            self.mesh_material = backend.new_material('MaterialMesh', color=color_rgba)
+        backend.assign_material(self.mesh_object, self.mesh_material)
+
+        return 0
+
+
+    def update(self, z=None, c=None, frame=None):
+        """
+        Update the heights and colors of the plotted surface in place.
+        The topology is kept, so the cost is proportional to the number of vertices.
+        The colors keep the range of the first plot. The heights of a surface
+        tessellated with tolerance or max_faces cannot be updated, as its
+        faces only fit the heights they were chosen for.
+
+        call signature:
+
+        update(z=None, c=None, frame=None):
+
+        Keyword arguments:
+
+        *z*:
+          New z coordinates of shape [nu, nv].
+
+        *c*:
+          New values for the colors of shape [nu, nv].
+
+        *frame*:
+          If specified, store z as a shape key which is only active at this
+          frame instead of changing the mesh, so the frames can be scrubbed.
+        """
 
-            print(colors.string_to_rgba(self.c))
-            self.mesh_material.diffuse_color = colors.string_to_rgba(self.c)
+        import numpy as np
+        from . import backends
 
-            # Link the mesh object with the scene.
-            bpy.context.scene.collection.objects.link(self.mesh_object)
+        if self.mesh_object is None:
+            print("Error: the surface has not been plotted.")
+            return -1
+        if isinstance(z, np.ndarray) and not z.shape == self.x.shape:
+            print("Error: z array shape invalid.")
+            return -1
+        if isinstance(z, np.ndarray) and not self.vertex_index is None:
+            print("Error: z of a tessellated surface cannot be updated, plot it again.")
+            return -1
+        if isinstance(c, np.ndarray) and not c.shape == self.x.shape:
+            print("Error: c array shape invalid.")
+            return -1
+
+        backend = backends.get_backend()
+
+        # Write the new vertex coordinates.
+        if isinstance(z, np.ndarray):
+            self.z = z
+            vertices = np.stack([self.x.ravel(), self.y.ravel(), self.z.ravel()],
+                                axis=-1).astype(np.float32)
+            if frame is None:
+                backend.set_vertices(self.mesh_data, vertices)
+            else:
+                backend.add_shape_key(self.mesh_object, vertices, frame)
+
+        # Write the new colors into the vertex attribute or image.
+        if isinstance(c, np.ndarray):
+            self.c = c
+            if self.color_mode == 'vertex' or not self.mesh_image is None:
+                self.__write_colors()
+            backend.update(self.mesh_data)
 
         return 0
+
+
+    def __write_colors(self):
+        """
+        Map the values of c onto colors and write them into the vertex color
+        attribute or the image pixels.
+        """
+
+        import numpy as np
+        from . import backends
+
+        backend = backends.get_backend()
+        color_mapper = self.color_mapper
+        if self.color_mode == 'vertex':
+            if self.vertex_index is None:
+                vertex_colors = color_mapper(self.c)
+                vertex_colors[:, 3] = self.alpha.ravel()
+            else:
+                vertex_colors = color_mapper(self.c.ravel()[self.vertex_index])
+                alpha = self.alpha.ravel()
+                vertex_colors[:, 3] = alpha if alpha.size == 1 else alpha[self.vertex_index]
+            backend.set_attribute(self.mesh_data, 'Color', vertex_colors)
+        else:
+            # Assign the RGBa values to the pixels, which are stored row by row along x.
+            pixels = np.empty([self.c.shape[1], self.c.shape[0], 4], dtype=np.float32)
+            color_mapper(self.c, out=pixels.transpose(1, 0, 2))
+            pixels[:, :, 3] = self.alpha.T
+            backend.set_pixels(self.mesh_image, pixels)
+            del(pixels)
+
+
+    def __vertex_color_material(self, blend):
+        """
+        Return the material which colors meshes by their 'Color' attribute.
+        It is created once and shared by all surfaces, with a second variant
+        for transparent surfaces.
+        """
+
+        from . import backends
+
+        backend = backends.get_backend()
+        name = VERTEX_COLOR_MATERIAL + ('Blend' if blend else '')
+        mesh_material = backend.get_material(name)
+        if mesh_material is None:
+            mesh_material = backend.new_material(name, blend=blend, color_attribute='Color',
+                                                 attribute_alpha=True)
+
+        return mesh_material
+
+
+# Name of the materials shared by the surfaces with vertex colors.
+VERTEX_COLOR_MATERIAL = 'MaterialVertexColor'
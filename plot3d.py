@@ -22,18 +22,22 @@ y0 = np.linspace(-3, 3, 20)
 z0 = np.linspace(-3, 3, 20)
 x, y, z = np.meshgrid(x0, y0, z0, indexing='ij')
 phi = np.exp(-(x**2+y**2+z**2))*np.cos(z)
-alpha = np.sin(np.linspace(phi.min(), phi.max(), 100))
-vol = blt.vol(phi, x, y, z)
+emission = np.sin(np.linspace(0, np.pi, 100))
+opacity = np.array([[phi.min(), 0, phi.max()], [0, 0.5, 2]])
+vol = blt.vol(phi, x, y, z, emission=emission, opacity=opacity, level=1, brick_size=8)
+vol.level = 0
 vol.plot()
 '''
 
-def vol(phi, x, y, z, emission=None, color_map=None):
+def vol(phi, x, y, z, emission=None, opacity=None, color_map=None,
+        level=0, brick_size=64, storage='float32'):
     """
     Plot a 3d volume rendering of a scalar field.
 
     call signature:
 
-    vol(phi, x, y, z, alpha=None, color_map=None)
+    vol(phi, x, y, z, emission=None, opacity=None, color_map=None,
+        level=0, brick_size=64, storage='float32')
 
     Keyword arguments:
 
@@ -49,9 +53,28 @@ def vol(phi, x, y, z, emission=None, color_map=None):
       phi which must be monotonously increasing and emission[1, ;] are their corresponding
       emission values.
 
+    *opacity*:
+      1d or 2d array of floats containing the opacity (absorption density)
+      values for phi. Same format as 'emission'.
+
     *color_map*:
       Color map for the values stored in the array 'c'.
-      These are the same as in matplotlib.
+      These are the same as in matplotlib, or a ColorMapper.
+
+    *level*:
+      Resolution level of the plotted volume. 0 is the full resolution and
+      every further level halves the resolution in each direction.
+      Use coarse levels for the interactive preview and 0 for the final render.
+
+    *brick_size*:
+      Number of voxels in each direction of the bricks the volume is split into.
+      Bricks which are empty after applying the transfer functions are not plotted.
+
+    *storage*:
+      Storage of the voxel colors in the Blender images.
+      'float32': rgba values with 16 bytes per voxel.
+      'uint8': 256 level palette indices in a byte image with 4 bytes per voxel
+      and a palette lookup table in the material.
     """
 
     import inspect
@@ -65,6 +88,124 @@ def vol(phi, x, y, z, emission=None, color_map=None):
     return volume_return
 
 
+def transfer_function(phi, control_points, phi_min=None, phi_max=None,
+                      out=None, chunk_size=2**20):
+    """
+    Evaluate a piecewise linear transfer function on a scalar field.
+
+    call signature:
+
+    transfer_function(phi, control_points, phi_min=None, phi_max=None,
+                      out=None, chunk_size=2**20)
+
+    Keyword arguments:
+
+    *phi*:
+      Scalar field of arbitrary shape. Can be a memory mapped array.
+
+    *control_points*:
+      1d array of values equally distributed between phi_min and phi_max
+      or 2d array of shape [2, n] with the monotonously increasing phi values
+      in control_points[0, :] and the corresponding values in control_points[1, :].
+
+    *phi_min, phi_max*:
+      Range of phi for 1d control points. If not specified, determine from phi.
+
+    *out*:
+      Optional float32 array of size phi.size into which the flattened
+      result is written. Can be a strided view, e.g. one channel of a pixel array.
+
+    *chunk_size*:
+      Number of values processed at once.
+    """
+
+    import numpy as np
+
+    control = _transfer_control_points(control_points, phi, phi_min, phi_max)
+    if not isinstance(control, tuple):
+        return -1
+    phi_points, values = control
+
+    if out is None:
+        out = np.empty(phi.size, dtype=np.float32)
+
+    # Interpolate chunk by chunk to avoid full size temporary arrays.
+    phi_flat = phi.reshape(-1)
+    for start in range(0, phi_flat.size, chunk_size):
+        stop = min(start + chunk_size, phi_flat.size)
+        out[start:stop] = np.interp(phi_flat[start:stop], phi_points, values)
+
+    return out
+
+
+def transfer_function_max(control_points, phi_lower, phi_upper, phi_min=None, phi_max=None):
+    """
+    Return the maximum of a transfer function within the given ranges of phi
+    without evaluating it on the data.
+
+    call signature:
+
+    transfer_function_max(control_points, phi_lower, phi_upper, phi_min=None, phi_max=None)
+
+    Keyword arguments:
+
+    *control_points*:
+      Control points of the transfer function as for transfer_function.
+
+    *phi_lower, phi_upper*:
+      Arrays with the lower and upper bounds of phi, e.g. for each brick.
+
+    *phi_min, phi_max*:
+      Range of phi for 1d control points.
+    """
+
+    import numpy as np
+
+    control = _transfer_control_points(control_points, None, phi_min, phi_max)
+    if not isinstance(control, tuple):
+        return -1
+    phi_points, values = control
+
+    # The maximum lies either on the bounds or on a control point in between.
+    phi_lower = np.asarray(phi_lower, dtype=np.float64)
+    phi_upper = np.asarray(phi_upper, dtype=np.float64)
+    result = np.maximum(np.interp(phi_lower, phi_points, values),
+                        np.interp(phi_upper, phi_points, values))
+    for phi_point, value in zip(phi_points, values):
+        inside = (phi_lower <= phi_point) & (phi_point <= phi_upper)
+        result[inside] = np.maximum(result[inside], value)
+
+    return result
+
+
+def _transfer_control_points(control_points, phi, phi_min, phi_max):
+    """
+    Return the phi values and transfer function values of the control points.
+    """
+
+    import numpy as np
+
+    control_points = np.asarray(control_points, dtype=np.float64)
+    if control_points.ndim == 1:
+        if phi_min is None:
+            phi_min = np.min(phi)
+        if phi_max is None:
+            phi_max = np.max(phi)
+        phi_points = np.linspace(phi_min, phi_max, control_points.size)
+        values = control_points
+    elif control_points.ndim == 2 and control_points.shape[0] == 2:
+        phi_points = control_points[0]
+        values = control_points[1]
+    else:
+        print("Error: transfer function control points invalid.")
+        return -1
+    if np.any(np.diff(phi_points) < 0):
+        print("Error: transfer function control points must be increasing.")
+        return -1
+
+    return phi_points, values
+
+
 class Volume(object):
     """
     Volume class including the data, 3d texture and parameters.
@@ -80,9 +221,61 @@ class Volume(object):
         self.y = 0
         self.z = 0
         self.emission = None
+        self.opacity = None
         self.color_map = None
+        self.level = 0
+        self.brick_size = 64
+        self.storage = 'float32'
+        self.n_voxels = 0
+        self.pyramid = None
+        self.pyramid_axes = None
+        self.brick_range = None
         self.mesh_object = None
         self.mesh_material = None
+        self.mesh_image = None
+
+
+    def build_pyramid(self):
+        """
+        Build the multi-resolution pyramid of the data.
+        Every level halves the resolution of the previous one and stores the
+        minimum and maximum of phi for each brick.
+        The downsampling is done slab by slab and never copies the full data.
+        """
+
+        import numpy as np
+
+        # Determine the 1d coordinate axes.
+        if self.x.ndim == 3:
+            axes = (self.x[:, 0, 0], self.y[0, :, 0], self.z[0, 0, :])
+        else:
+            axes = (self.x, self.y, self.z)
+
+        self.pyramid = [self.phi]
+        self.pyramid_axes = [axes]
+        self.brick_range = [self.__brick_range(self.phi)]
+        while max(self.pyramid[-1].shape) > self.brick_size:
+            phi_fine = self.pyramid[-1]
+            starts = [np.arange(0, n, 2) for n in phi_fine.shape]
+            counts = [np.diff(np.append(start, n)) for start, n in zip(starts, phi_fine.shape)]
+            counts_yz = counts[1][:, np.newaxis]*counts[2][np.newaxis, :]
+
+            # Average blocks of 2x2x2 voxels slab by slab.
+            phi_coarse = np.empty([start.size for start in starts], dtype=np.float32)
+            rows = max(self.brick_size//2, 1)
+            for row in range(0, phi_coarse.shape[0], rows):
+                slab = phi_fine[2*row:2*(row+rows)].astype(np.float64)
+                slab = np.add.reduceat(slab, np.arange(0, slab.shape[0], 2), axis=0)
+                slab = np.add.reduceat(slab, starts[1], axis=1)
+                slab = np.add.reduceat(slab, starts[2], axis=2)
+                phi_coarse[row:row+rows] = slab/(counts[0][row:row+rows, np.newaxis, np.newaxis]
+                                                 *counts_yz)
+
+            axes = tuple(np.add.reduceat(axis, start)/count
+                         for axis, start, count in zip(axes, starts, counts))
+            self.pyramid.append(phi_coarse)
+            self.pyramid_axes.append(axes)
+            self.brick_range.append(self.__brick_range(phi_coarse))
 
 
     def plot(self):
@@ -90,9 +283,9 @@ class Volume(object):
         Plot the 3d texture.
         """
 
-        import bpy
         import numpy as np
-        import matplotlib.cm as cm
+        from . import backends
+        from . import colors
 
         # Check the validity of the input arrays.
         if (not isinstance(self.x, np.ndarray) or not isinstance(self.y, np.ndarray)
@@ -102,78 +295,222 @@ class Volume(object):
         if not isinstance(self.phi, np.ndarray):
             print("Error: phi must be numpy array.")
             return -1
-        if self.emission:
+        if self.phi.ndim != 3:
+            print("Error: phi must be of shape [nx, ny, nz].")
+            return -1
+        if not self.emission is None:
             if not isinstance(self.emission, np.ndarray):
                 print("Error: emission must be numpy array.")
                 return -1
+        if not self.opacity is None:
+            if not isinstance(self.opacity, np.ndarray):
+                print("Error: opacity must be numpy array.")
+                return -1
+        if not self.storage in ['float32', 'uint8']:
+            print("Error: storage must be 'float32' or 'uint8'.")
+            return -1
+        if self.emission is None:
+            emission = np.array([0, 1])
+        else:
+            emission = self.emission
 
-        # Using volumetric textures or voxels?
+        # Build the pyramid unless it exists for this data.
+        if self.pyramid is None or not self.pyramid[0] is self.phi:
+            self.build_pyramid()
+        if not 0 <= self.level < len(self.pyramid):
+            print("Error: level must be between 0 and {0}.".format(len(self.pyramid)-1))
+            return -1
+        backend = backends.get_backend()
+        phi = self.pyramid[self.level]
+        axes = self.pyramid_axes[self.level]
+        brick_range = self.brick_range[self.level]
+        phi_min = self.brick_range[0][..., 0].min()
+        phi_max = self.brick_range[0][..., 1].max()
+
+        # An unset color mapper takes the range of the whole data, not of the first brick.
+        if isinstance(self.color_map, colors.ColorMapper):
+            self.color_map.autoscale(np.array([phi_min, phi_max]))
+
+        # Find the bricks which are not empty after applying the transfer functions.
+        visible = transfer_function_max(emission, brick_range[..., 0], brick_range[..., 1],
+                                        phi_min, phi_max)
+        if not isinstance(visible, np.ndarray):
+            return -1
+        visible = visible > 0
+        if not self.opacity is None:
+            opacity_max = transfer_function_max(self.opacity, brick_range[..., 0],
+                                                brick_range[..., 1], phi_min, phi_max)
+            if not isinstance(opacity_max, np.ndarray):
+                return -1
+            visible = visible | (opacity_max > 0)
 
         # Delete existing meshes.
         if not self.mesh_object is None:
-            bpy.ops.object.select_all(action='DESELECT')
-            self.mesh_object.select = True
-            bpy.ops.object.delete()
-            self.mesh_object = None
+            for mesh_object in self.mesh_object:
+                backend.remove(mesh_object)
+        self.mesh_object = []
 
-        # Delete existing materials.
+        # Delete existing materials and images.
         if not self.mesh_material is None:
-            bpy.data.materials.remove(self.mesh_material)
+            for mesh_material in self.mesh_material:
+                backend.remove(mesh_material)
+        self.mesh_material = []
+        if not self.mesh_image is None:
+            for mesh_image in self.mesh_image:
+                backend.remove(mesh_image)
+        self.mesh_image = []
+
+        # For the palette storage all voxels share one lookup table of 256 colors.
+        if self.storage == 'uint8':
+            palette = np.empty([256, 4], dtype=np.float32)
+            if self.__voxel_colors(np.linspace(phi_min, phi_max, 256), emission,
+                                   phi_min, phi_max, palette) == -1:
+                return -1
+            palette_image = backend.new_image('ImagePalette', 256, 1, palette)
+            self.mesh_image.append(palette_image)
+        else:
+            palette_image = None
+        self.n_voxels = 0
+
+        # The float32 pixels of all bricks are written through one buffer,
+        # as Blender only accepts float32 pixel values.
+        brick_shape = np.minimum(self.brick_size, phi.shape)
+        pixel_buffer = np.empty([np.prod(brick_shape), 4], dtype=np.float32)
+
+        # Boundaries of the voxels.
+        edges = []
+        for axis in axes:
+            edges.append(np.concatenate([axis[:1], (axis[1:] + axis[:-1])/2, axis[-1:]]))
+
+        # Corners and outward facing sides of the unit cube.
+        corners = np.array([[i, j, k] for i in range(2) for j in range(2) for k in range(2)])
+        sides = np.array([[0, 1, 3, 2], [4, 6, 7, 5], [0, 4, 5, 1],
+                          [2, 3, 7, 6], [0, 2, 6, 4], [1, 5, 7, 3]])
+
+        for brick_index in zip(*np.nonzero(visible)):
+            brick_slice = tuple(slice(index*self.brick_size, (index+1)*self.brick_size)
+                                for index in brick_index)
+            phi_brick = phi[brick_slice]
+            lower = np.array([edge[index.start] for edge, index in zip(edges, brick_slice)])
+            upper = np.array([edge[min(index.stop, edge.size-1)]
+                              for edge, index in zip(edges, brick_slice)])
+
+            # Create cuboid spanning the brick.
+            mesh_object = backend.new_mesh('Volume', lower + corners*(upper - lower), sides)
+            self.mesh_object.append(mesh_object)
+
+            # Store the voxels as stacked x-slices in a 2d image.
+            nx, ny, nz = phi_brick.shape
+            pixels = pixel_buffer[:phi_brick.size]
+            if self.storage == 'uint8':
+                voxels = colors.quantize(phi_brick, phi_min, phi_max, 256)
+                np.multiply(voxels.reshape(-1, 1), 1/255, out=pixels[:, :3])
+                pixels[:, 3] = 1
+                del(voxels)
+                mesh_image = backend.new_image('ImageVolume', nz, nx*ny, pixels, alpha=False,
+                                               float_buffer=False, non_color=True)
+            else:
+                if self.__voxel_colors(phi_brick, emission, phi_min, phi_max, pixels) == -1:
+                    return -1
+                mesh_image = backend.new_image('ImageVolume', nz, nx*ny, pixels)
+            self.mesh_image.append(mesh_image)
+            self.n_voxels += phi_brick.size
+
+            # Assign a material to the cuboid.
+            self.mesh_material.append(backend.new_volume_material('MaterialMesh', mesh_image,
+                                                                  nx, palette_image))
+            backend.assign_material(mesh_object, self.mesh_material[-1])
+
+        return 0
 
-        # Create cuboid.
-        bpy.ops.mesh.primitive_cube_add()
-        self.mesh_object = bpy.context.object
+
+    def memory_footprint(self):
+        """
+        Return the number of bytes of the voxel images which Blender holds for
+        the plotted bricks and of float32 rgba images for comparison.
+        """
+
+        bytes_per_voxel = {'float32': 16, 'uint8': 4}[self.storage]
+        footprint = self.n_voxels*bytes_per_voxel
+        if self.storage == 'uint8':
+            footprint += 256*4*4
+
+        return footprint, self.n_voxels*16
+
+
+    def __voxel_colors(self, phi, emission, phi_min, phi_max, out):
+        """
+        Compute the rgba values of voxels with the color premultiplied by the
+        emission and the opacity stored in the alpha channel.
+
+        call signature:
+
+        __voxel_colors(phi, emission, phi_min, phi_max, out):
+
+        Keyword arguments:
+
+        *phi*:
+          Values of phi of the voxels.
+
+        *emission*:
+          Control points of the emission transfer function.
+
+        *phi_min, phi_max*:
+          Range of phi for the color map and the transfer functions.
+
+        *out*:
+          Array of shape [phi.size, 4] into which the colors are written.
+        """
+
+        import numpy as np
+        from . import colors
 
         # Define the RGB value for each voxel.
-        phi_max = np.max(self.phi)
-        phi_min = np.min(self.phi)
-        if self.color_map is None:
-            self.color_map = cm.viridis
-        pixels[0::3] = self.color_map((self.phi.flatten() - phi_min)/(phi_max - phi_min))[:, 0]
-        pixels[1::3] = self.color_map((self.phi.flatten() - phi_min)/(phi_max - phi_min))[:, 1]
-        pixels[2::3] = self.color_map((self.phi.flatten() - phi_min)/(phi_max - phi_min))[:, 2]
-
-        # Define the emission for each voxel.
-        emission = np.zeros_like(self.phi)
-        if self.emission.ndim == 1:
-            phi_emission = np.zeros([2, self.emission.size])
-            phi_emission[0, :] = np.linspace(self.phi.min(), self.size.max(), self.emission.size)
-            phi_emission[1, :] = self.emission
+        if isinstance(self.color_map, colors.ColorMapper):
+            self.color_map(phi, out=out)
         else:
-            phi_emission = self.emission
+            colors.map_colors(phi, phi_min, phi_max, self.color_map, out=out)
 
-        for emission_idx in self.emission.shape[-1]-1:
-            mask = self.phi >= phi_emission[0, emission_idx] and self.phi < phi_emission[0, emission_idx+1]
-            weight_left = self.phi[mask] - phi_emission[0, emission_idx]
-            weight_right = -self.phi[mask] + phi_emission[0, emission_idx+1]
-            emission[mask] = (weight_left*phi_emission[1, emission_idx] + \
-                              weight_right*phi_emission[1, emission_idx+1]) \
-                             /(weight_left + weight_right)
-        del(emission)
+        # Define the emission for each voxel and premultiply it with the color.
+        emission_values = transfer_function(phi, emission, phi_min, phi_max, out=out[:, 3])
+        if not isinstance(emission_values, np.ndarray):
+            return -1
+        out[:, :3] *= out[:, 3:]
 
-        # Assign a material to the cuboid.
-        self.mesh_material = bpy.data.materials.new('MaterialMesh')
-        self.mesh_material.use_nodes = True
+        # Define the opacity for each voxel.
+        if self.opacity is None:
+            out[:, 3] = 0
+        else:
+            opacity_values = transfer_function(phi, self.opacity, phi_min, phi_max, out=out[:, 3])
+            if not isinstance(opacity_values, np.ndarray):
+                return -1
 
-        # Add the RGB and emission values to the material.
-        nodes = node_tree.nodes
-        # Remove diffusive BSDF node.
-        nodes.remove(nodes[1])
-        # Add the emission shader.
-        node_emission = nodes.new(type='ShaderNodeEmission')
-        # Link the emission output to the material output.
-        node_tree.links.new(node_emission.outputs['Emission'],
-                            nodes[0].inputs['Volume'])
-        # Add the RGB source node.
+        return 0
 
-        # Link the RGB output to the emission shader  color input.
 
-        # Add the emission source node.
+    def __brick_range(self, phi):
+        """
+        Compute the minimum and maximum of phi within each brick.
 
-        # Link the emission output to the emission shader strength input.
+        call signature:
 
+        __brick_range(phi):
 
-        return 0
+        Keyword arguments:
+
+        *phi*:
+          Scalar field of shape [nx, ny, nz].
+        """
+
+        import numpy as np
+
+        n_bricks = [(n - 1)//self.brick_size + 1 for n in phi.shape]
+        brick_range = np.empty(n_bricks + [2])
+        for index in np.ndindex(*n_bricks):
+            brick = phi[tuple(slice(i*self.brick_size, (i+1)*self.brick_size) for i in index)]
+            brick_range[index] = brick.min(), brick.max()
+
+        return brick_range
 
 
 
@@ -385,6 +722,8 @@ class Quiver3d(object):
                 self.color = np.sqrt(self.u**2 + self.v**2 + self.w**2)
         color_rgba = colors.make_rgba_array(self.color, self.x.shape[0],
                                           self.color_map, self.vmin, self.vmax)
+        if isinstance(color_rgba, int):
+            return -1
 
         # Prepare the materials list.
         self.mesh_material = []
@@ -580,39 +919,40 @@ sys.path.append('~/codes/blendaviz')
 import blendaviz as blt
 importlib.reload(blt)
 importlib.reload(blt.plot3d)
-x = np.linspace(-2, 2, 5)
-y = np.linspace(-2, 2, 5)
-z = np.linspace(-2, 2, 5)
-xx, yy, zz = np.meshgrid(x, y, z)
+x = np.linspace(-2, 2, 50)
+y = np.linspace(-2, 2, 50)
+z = np.linspace(-2, 2, 50)
+xx, yy, zz = np.meshgrid(x, y, z, indexing='ij')
 phi = np.sin(3*xx) + np.cos(2*yy) + np.sin(zz)
-iso = blt.contour(phi)
+iso = blt.contour(phi, x, y, z)
+iso = blt.contour(phi, xx, yy, zz, contours=np.array([-1, 0, 1]), color=np.array([-1, 0, 1]))
+iso.contours = np.array([0.5])
+iso.plot()
+iso = blt.contour(phi, x, y, z, max_faces=2000)
+print(iso.decimation_info)
 '''
 
-# TODO:
-# - 1) Find surface of constant phi.
-# - 2) Define mesh for constant phi.
-# - 3) Add material.
-# - 4) Add custom contour levels.
-
 def contour(phi, x, y, z, contours=3,
            color=(0, 1, 0), alpha=1, emission=None, roughness=1,
-           vmin=None, vmax=None, color_map=None):
+           vmin=None, vmax=None, color_map=None, n_workers=1,
+           max_faces=None, max_error=None):
     """
     Plot contours to a given scalar field.
 
     call signature:
 
-    quiver(phi, x, y, z, contours=3,
-           color=(0, 1, 0), alpha=1, emission=None, roughness=1,
-           vmin=None, vmax=None, color_map=None):
+    contour(phi, x, y, z, contours=3,
+            color=(0, 1, 0), alpha=1, emission=None, roughness=1,
+            vmin=None, vmax=None, color_map=None, n_workers=1,
+            max_faces=None, max_error=None):
 
     Keyword arguments:
     *phi*:
       Scalar of shape [nx, ny, nz].
 
     *x, y, z*:
-      x, y and z position of the data. These can be 1d arrays of the same length
-      or of shape [nx, ny, nz].
+      x, y and z position of the data. These can be 1d arrays of length
+      nx, ny and nz or of shape [nx, ny, nz].
 
     *contours*
       Number of contours to be plotted, or array of contour levels.
@@ -620,16 +960,19 @@ def contour(phi, x, y, z, contours=3,
     *color*:
       rgba values of the form (r, g, b) with 0 <= r, g, b <= 1, or string,
       e.g. 'red' or character, e.g. 'r', or list of strings/character,
-      or [n, 3] array with rgba values or array of the same shape as input array.
+      or [n, 3] array with rgba values or array with one value per contour level.
 
     *alpha*:
       Alpha (opacity) value for the contours.
+      Real number or array with one value per contour level.
 
     *emission*
       Light emission by the contours. This overrides 'alpha' and 'roughness'.
+      Real number or array with one value per contour level.
 
     *roughness*:
       Texture roughness.
+      Real number or array with one value per contour level.
 
     *vmin, vmax*
       Minimum and maximum values for the colormap. If not specify, determine
@@ -638,6 +981,17 @@ def contour(phi, x, y, z, contours=3,
     *color_map*:
       Color map for the values stored in the array 'c'.
       These are the same as in matplotlib.
+
+    *n_workers*:
+      Number of processes for the contour extraction. For more than one,
+      phi is split into slabs in x which are extracted in parallel.
+
+    *max_faces*:
+      Maximum number of triangles for each contour level. Larger meshes
+      are decimated by vertex clustering before they are created.
+
+    *max_error*:
+      Maximum vertex displacement for the decimation if max_faces is not given.
     """
 
     import inspect
@@ -665,6 +1019,7 @@ class Contour3d(object):
         self.x = 0
         self.y = 0
         self.z = 0
+        self.contours = 3
         self.color = (0, 1, 0)
         self.alpha = 1
         self.emission = None
@@ -672,6 +1027,12 @@ class Contour3d(object):
         self.vmin = None
         self.vmax = None
         self.color_map = None
+        self.n_workers = 1
+        self.max_faces = None
+        self.max_error = None
+        self.decimation_info = None
+        self.levels = None
+        self.block_index = None
         self.contour_mesh = None
         self.mesh_material = None
 
@@ -681,105 +1042,78 @@ class Contour3d(object):
         Plot the contours.
         """
 
-        import bpy
         import numpy as np
+        from . import backends
         from . import colors
+        from . import isosurface
 
         # Check the validity of the input arrays.
+        if not isinstance(self.phi, np.ndarray) or self.phi.ndim != 3:
+            print("Error: phi must be numpy array of shape [nx, ny, nz].")
+            return -1
         if not isinstance(self.x, np.ndarray) or not isinstance(self.y, np.ndarray) \
            or not isinstance(self.z, np.ndarray):
             print("Error: x OR y OR z array invalid.")
             return -1
-        if not (self.x.shape == self.y.shape == self.z.shape == self.phi.shape):
+        if not ((self.x.shape == self.y.shape == self.z.shape == self.phi.shape) or
+                ((self.x.size, self.y.size, self.z.size) == self.phi.shape and
+                 self.x.ndim == self.y.ndim == self.z.ndim == 1)):
             print("Error: input array shapes invalid.")
             return -1
 
-        # Flatten the input array.
-        self.phi = self.phi.ravel()
-        self.x = self.x.ravel()
-        self.y = self.y.ravel()
-        self.z = self.z.ravel()
+        # Index the block ranges of phi once, so new levels only visit active blocks.
+        if self.block_index is None or not self.block_index.phi is self.phi:
+            self.block_index = isosurface.MinMaxIndex(self.phi)
+
+        # Determine the contour levels.
+        if isinstance(self.contours, np.ndarray):
+            self.levels = self.contours.ravel()
+        elif isinstance(self.contours, int) and self.contours > 0:
+            self.levels = np.linspace(self.block_index.block_min.min(),
+                                      self.block_index.block_max.max(),
+                                      self.contours+2)[1:-1]
+        else:
+            print("Error: contours must be a positive integer or an array of levels.")
+            return -1
 
         # Delete existing meshes.
+        backend = backends.get_backend()
         if not self.contour_mesh is None:
-            bpy.ops.object.select_all(action='DESELECT')
-            self.contour_mesh.select = True
-            bpy.ops.object.delete()
-            self.contour_mesh = None
+            for contour_mesh in self.contour_mesh:
+                backend.remove(contour_mesh)
         self.contour_mesh = []
 
         # Delete existing materials.
         if not self.mesh_material is None:
-            if isinstance(self.mesh_material, list):
-                for mesh_material in self.mesh_material:
-                    bpy.data.materials.remove(mesh_material)
-            else:
-                bpy.data.materials.remove(self.mesh_material)
-
-        # Prepare the material colors.
-        if isinstance(self.color, str):
-            if self.color == 'magnitude':
-                self.color = np.sqrt(self.u**2 + self.v**2 + self.w**2)
-        color_rgba = colors.make_rgba_array(self.color, self.x.shape[0],
-                                          self.color_map, self.vmin, self.vmax)
-
-        # Prepare the materials list.
+            for mesh_material in self.mesh_material:
+                backend.remove(mesh_material)
         self.mesh_material = []
 
-        # Plot the arrows.
-        for idx in range(len(self.x)):
-            # Determine the length of the arrow.
-            magnitude = np.sqrt(self.u[idx]**2 + self.v[idx]**2 + self.w[idx]**2)
-            normed = np.array([self.u[idx], self.v[idx], self.w[idx]])/magnitude
-            rotation = Vector((0, 0, 1)).rotation_difference([self.u[idx], self.v[idx], self.w[idx]]).to_euler()
-
-            # Define the arrow's length.
-            if isinstance(self.length, np.ndarray):
-                length = self.length[idx]
-            elif self.length == 'magnitude':
-                length = magnitude
-            else:
-                length = self.length
-
-            # Define the arrow's radii.
-            if isinstance(self.radius_shaft, np.ndarray):
-                radius_shaft = self.radius_shaft[idx]
-            else:
-                radius_shaft = self.radius_shaft
-            if isinstance(self.radius_tip, np.ndarray):
-                radius_tip = self.radius_tip[idx]
-            else:
-                radius_tip = self.radius_tip
-
-            if self.pivot == 'tail':
-                location = [self.x[idx] + length*normed[0]/2,
-                            self.y[idx] + length*normed[1]/2,
-                            self.z[idx] + length*normed[2]/2]
-            if self.pivot == 'tip':
-                location = [self.x[idx] - length*normed[0]/2,
-                            self.y[idx] - length*normed[1]/2,
-                            self.z[idx] - length*normed[2]/2]
-            if self.pivot == 'mid' or self.pivot == 'middle':
-                location = [self.x[idx], self.y[idx], self.z[idx]]
-            location = np.array(location)
-
-            # Construct the arrow using a cylinder and cone.
-            bpy.ops.mesh.primitive_cylinder_add(radius=radius_shaft, depth=length/2,
-                                                location=location-normed*length/4, rotation=rotation)
-            self.arrow_mesh.append(bpy.context.object)
-            bpy.ops.mesh.primitive_cone_add(radius1=radius_tip, radius2=0, depth=length/2,
-                                            location=location+normed*length/4, rotation=rotation)
-            self.arrow_mesh.append(bpy.context.object)
+        # Prepare the material colors.
+        color_rgba = colors.make_rgba_array(self.color, self.levels.size,
+                                            self.color_map, self.vmin, self.vmax)
+        if isinstance(color_rgba, int):
+            print("Error: color must have one entry per contour level.")
+            return -1
 
+        # Extract one welded mesh for each contour level in a single sweep.
+        if self.n_workers > 1:
+            meshes = isosurface.marching_cubes_parallel(self.phi, self.levels,
+                                                        self.x, self.y, self.z,
+                                                        n_workers=self.n_workers)
+        else:
+            meshes = isosurface.marching_cubes_levels(self.phi, self.levels,
+                                                      self.x, self.y, self.z,
+                                                      index=self.block_index)
+        self.decimation_info = []
+        for idx, (vertices, faces) in enumerate(meshes):
+            if not self.max_faces is None or not self.max_error is None:
+                vertices, faces, info = isosurface.decimate(vertices, faces, self.max_faces,
+                                                            self.max_error)
+                self.decimation_info.append(info)
+            self.contour_mesh.append(backend.new_mesh('Contour', vertices, faces))
             self.__set_material(idx, color_rgba)
 
-        # Group the meshes together.
-        for mesh in self.arrow_mesh[::-1]:
-            mesh.select = True
-        bpy.ops.object.join()
-        self.arrow_mesh = bpy.context.object
-        self.arrow_mesh.select = False
-
         return 0
 
 
@@ -794,117 +1128,34 @@ class Contour3d(object):
         Keyword arguments:
 
         *idx*:
-          Index of the material.
+          Index of the contour level.
 
         *color_rgba*:
           The rgba values of the colors to be used.
         """
 
-        import bpy
         import numpy as np
+        from . import backends
 
-        # Deterimne if we need a list of materials, i.e. for every arrow mesh one.
-        if any([isinstance(self.color, np.ndarray),
-                isinstance(self.alpha, np.ndarray),
-                isinstance(self.emission, np.ndarray),
-                isinstance(self.roughness, np.ndarray)]):
-            list_material = True
+        # Pick the values for this contour level.
+        color = np.ones(4)
+        color[:len(color_rgba[idx])] = color_rgba[idx]
+        if isinstance(self.alpha, np.ndarray):
+            color[3] = self.alpha[idx]
         else:
-            list_material = False
-
-        # Transform single values to arrays.
-        if list_material:
-            if color_rgba.shape[0] != self.x.shape[0]:
-                print('color_rgba.shape = {0}'.format(color_rgba.shape))
-                color_rgba = np.repeat(color_rgba, self.x.shape[0], axis=0)
-                print('color_rgba.shape = {0}'.format(color_rgba.shape))
-            if not isinstance(self.alpha, np.ndarray):
-                self.alpha = np.ones(self.x.shape[0])*self.alpha
-            if not isinstance(self.roughness, np.ndarray):
-                self.roughness = np.ones(self.x.shape[0])*self.roughness
-            if not self.emission is None:
-                if not isinstance(self.emission, np.ndarray):
-                    self.emission = np.ones(self.x.emission[0])*self.emission
-
-        # Set the material.
-        if list_material:
-            self.mesh_material.append(bpy.data.materials.new('material'))
-            self.arrow_mesh[2*idx].active_material = self.mesh_material[idx]
-            self.arrow_mesh[2*idx+1].active_material = self.mesh_material[idx]
+            color[3] = self.alpha
+        if isinstance(self.roughness, np.ndarray):
+            roughness = self.roughness[idx]
         else:
-            if idx == 0:
-                self.mesh_material.append(bpy.data.materials.new('material'))
-                self.mesh_material[0].diffuse_color = color_rgba[idx]
-            self.arrow_mesh[2*idx].active_material = self.mesh_material[0]
-            self.arrow_mesh[2*idx+1].active_material = self.mesh_material[0]
-
-        # Set the diffusive color.
-        if list_material:
-            self.mesh_material[idx].diffuse_color = color_rgba[idx]
+            roughness = self.roughness
+        if isinstance(self.emission, np.ndarray):
+            emission = self.emission[idx]
         else:
-            self.mesh_material[0].diffuse_color = color_rgba[0]
-
-        # Set the material alpha value.
-        if list_material:
-            if isinstance(self.alpha, np.ndarray):
-                self.mesh_material[idx].alpha = self.alpha[idx]
-                if self.alpha[idx] < 1.0:
-                    self.mesh_material[idx].transparency_method = 'Z_TRANSPARENCY'
-                    self.mesh_material[idx].use_transparency = True
-            else:
-                self.mesh_material[idx].alpha = self.alpha
-                if self.alpha < 1.0:
-                    self.mesh_material[idx].transparency_method = 'Z_TRANSPARENCY'
-                    self.mesh_material[idx].use_transparency = True
-        elif idx == 0:
-            self.mesh_material[0].alpha = self.alpha
-            if self.alpha < 1.0:
-                self.mesh_material[0].transparency_method = 'Z_TRANSPARENCY'
-                self.mesh_material[0].use_transparency = True
-
-        # Set the material roughness.
-        if list_material:
-            if isinstance(self.roughness, np.ndarray):
-                self.mesh_material[idx].roughness = self.roughness[idx]
-            else:
-                self.mesh_material[idx].roughness = self.roughness
-        elif idx == 0:
-            self.mesh_material[0].roughness = self.roughness
-
-        # Set the material emission.
-        if not self.emission is None:
-            if list_material:
-                self.mesh_material[idx].use_nodes = True
-                node_tree = self.mesh_material[idx].node_tree
-                nodes = node_tree.nodes
-                # Remove Diffusive BSDF node.
-                nodes.remove(nodes[1])
-                node_emission = nodes.new(type='ShaderNodeEmission')
-                # Change the input of the ouput node to emission.
-                node_tree.links.new(node_emission.outputs['Emission'],
-                                    nodes[0].inputs['Surface'])
-                # Adapt emission and color.
-                node_emission.inputs['Color'].default_value = tuple(color_rgba[idx]) + (1, )
-                if isinstance(self.emission, np.ndarray):
-                    node_emission.inputs['Strength'].default_value = self.emission[idx]
-                else:
-                    node_emission.inputs['Strength'].default_value = self.emission
-            else:
-                self.mesh_material[0].use_nodes = True
-                node_tree = self.mesh_material[0].node_tree
-                nodes = node_tree.nodes
-                # Remove Diffusive BSDF node.
-                nodes.remove(nodes[1])
-                node_emission = nodes.new(type='ShaderNodeEmission')
-                # Change the input of the ouput node to emission.
-                node_tree.links.new(node_emission.outputs['Emission'],
-                                    nodes[0].inputs['Surface'])
-                # Adapt emission and color.
-                node_emission.inputs['Color'].default_value = color_rgba[idx] + (1, )
-                if isinstance(self.emission, np.ndarray):
-                    node_emission.inputs['Strength'].default_value = self.emission
-                else:
-                    node_emission.inputs['Strength'].default_value = self.emission
-
-
-
+            emission = self.emission
+
+        # Set the material color, alpha value, roughness and emission.
+        backend = backends.get_backend()
+        self.mesh_material.append(backend.new_material('material', color=color,
+                                                       roughness=roughness, emission=emission,
+                                                       blend=color[3] < 1.0))
+        backend.assign_material(self.contour_mesh[idx], self.mesh_material[idx])
@@ -203,6 +203,8 @@ class Streamlines3d(object):
         # Prepare the material colors.
         color_rgba = colors.make_rgba_array(self.color, self.seeds.shape[0],
                                             self.color_map, self.vmin, self.vmax)
+        if isinstance(color_rgba, int):
+            return -1
 
         # Compute the streamlines.
         tracers = []
@@ -92,7 +92,6 @@ class arrow(object):
         import bpy
         import numpy as np
         from mathutils import Vector
-        import matplotlib.cm as cm
         #deselect all objects
         bpy.ops.object.select_all(action='DESELECT')
 